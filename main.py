@@ -1,44 +1,64 @@
 from flask import Flask, render_template, request, jsonify, send_file, session, redirect, url_for
 from flask_cors import CORS
-import PyPDF2
+from flask_session import Session
 import re
 import hashlib
 from datetime import datetime, timedelta
 import io
 import os
+import time
 import json
-from functools import wraps
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import numpy as np
-from collections import defaultdict
+import logging
+import queue
+import atexit
+import orjson
+from functools import wraps, lru_cache
+from collections import Counter, OrderedDict
+from itertools import islice
 import secrets
 from werkzeug.utils import secure_filename
 import base64
 import sqlite3
-from contextlib import closing
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from logging.handlers import QueueHandler, QueueListener
+from cachetools import TTLCache
+from policy_analyzer import RiskPredictor, PolicyAnalyzer, analyze_pdf
 
 # ============= NEW IMPORTS FOR OPENAI =============
-import openai
 from openai import OpenAI
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Under `python main.py`, spawned analysis workers re-run this file as __mp_main__.
+# They only use policy_analyzer, so the process-wide setup below is skipped for them
+_SPAWNED_WORKER = __name__ == '__mp_main__'
+
+# Logging: records are queued by the caller and written to stderr by a listener thread
+logger = logging.getLogger('claimguard')
+if not _SPAWNED_WORKER:
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    _log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(_log_queue))
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    _log_listener = QueueListener(_log_queue, _log_handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
 # Initialize OpenAI client
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
-if OPENAI_API_KEY:
-    client = OpenAI(api_key=OPENAI_API_KEY)
-else:
-    client = None
-    print("Warning: OPENAI_API_KEY not set. Using fallback extraction only.")
+client = None
+if not _SPAWNED_WORKER:
+    if OPENAI_API_KEY:
+        client = OpenAI(api_key=OPENAI_API_KEY)
+    else:
+        logger.warning("OPENAI_API_KEY not set. Using fallback extraction only.")
 # ==================================================
 
 # Configuration
@@ -46,26 +66,42 @@ app = Flask(__name__,
             static_folder='static',
             template_folder='templates')
 
+ALLOWED_EXTENSIONS = frozenset({'pdf'})
+
 # App Configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(32))
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['ALLOWED_EXTENSIONS'] = {'pdf'}
+app.config['ALLOWED_EXTENSIONS'] = ALLOWED_EXTENSIONS
 app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production with HTTPS
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=1)
+app.config['SESSION_TYPE'] = 'filesystem'  # Server-side sessions; the cookie only carries the session id
+app.config['SESSION_FILE_DIR'] = 'flask_session'
+app.config['SESSION_FILE_THRESHOLD'] = 10000  # Sessions kept on disk; past this, cachelib drops expired ones, then arbitrary live ones
 app.config['DATABASE'] = 'claimguard.db'
+app.config['ANALYSIS_CACHE_SIZE'] = 512  # PDF analyses kept in memory for repeat uploads
+app.config['ANALYSIS_WORKERS'] = os.cpu_count()  # Processes for PDF extraction and analysis
+app.config['CHART_CACHE_SIZE'] = 300  # Rendered analysis charts kept for /api/chart
+app.config['POLICY_CACHE_SIZE'] = 2048  # Policies kept in memory by get_policy_by_id
+app.config['POLICY_CACHE_TTL'] = 300  # Seconds a cached policy is served before re-reading it
+app.config['REPORT_FOLDER'] = 'reports'  # Report files and their job markers, one directory per user
+app.config['REPORT_JOB_LIMIT'] = 200  # Finished report jobs kept for polling before the oldest are dropped
+app.config['REPORT_TIMEOUT'] = 120  # Seconds a report may stay pending before polls treat it as failed
 
-# Create necessary directories
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs('templates', exist_ok=True)
-os.makedirs('static', exist_ok=True)
-os.makedirs('static/css', exist_ok=True)
-os.makedirs('static/js', exist_ok=True)
-os.makedirs('static/images', exist_ok=True)
-
-CORS(app)
+if not _SPAWNED_WORKER:
+    # Create necessary directories
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['REPORT_FOLDER'], exist_ok=True)
+    os.makedirs('templates', exist_ok=True)
+    os.makedirs('static', exist_ok=True)
+    os.makedirs('static/css', exist_ok=True)
+    os.makedirs('static/js', exist_ok=True)
+    os.makedirs('static/images', exist_ok=True)
+    
+    CORS(app)
+    Session(app)
 
 # ============= NEW OPENAI EXTRACTION FUNCTION =============
 def ai_extract_policy_details(policy_text):
@@ -132,240 +168,353 @@ Extract ONLY from the provided text. Do not make up information."""
             'covered_diseases': result.get('covered_diseases', [])
         }
         
-        print(f"AI extracted: {cleaned_result}")  # For debugging
+        logger.debug("AI extracted: %s", cleaned_result)
         return cleaned_result
         
-    except Exception as e:
-        print(f"OpenAI extraction error: {str(e)}")
+    except Exception:
+        logger.exception("OpenAI extraction error")
         return None
 # ==========================================================
 
 # Database functions
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+def _dumps(obj):
+    """Serialize a value to JSON text for storage in a TEXT column"""
+    return orjson.dumps(obj).decode()
+
+_loads = orjson.loads
+
 def get_db():
-    """Get database connection"""
-    db = sqlite3.connect(app.config['DATABASE'])
-    db.row_factory = sqlite3.Row
+    """Get this thread's database connection, opening it on first use"""
+    db = getattr(_local, 'db', None)
+    if db is None:
+        # Autocommit mode: every write commits on its own
+        db = sqlite3.connect(app.config['DATABASE'], check_same_thread=False, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.executescript('''
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+        ''')
+        _local.db = db
+        _ensure_schema()
     return db
 
+def _ensure_schema():
+    """Create the schema the first time this process opens the database"""
+    global _schema_ready
+    with _schema_lock:
+        if not _schema_ready:
+            init_db_schema()
+            _schema_ready = True
+
 def init_db():
     """Initialize database tables"""
-    with closing(get_db()) as db:
-        with app.open_resource('schema.sql', mode='r') as f:
-            db.cursor().executescript(f.read())
-        db.commit()
+    db = get_db()
+    with app.open_resource('schema.sql', mode='r') as f:
+        db.executescript(f.read())
 
 def init_db_schema():
     """Create database schema if not exists"""
-    with closing(get_db()) as db:
-        # Create users table
-        db.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                phone TEXT UNIQUE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create policies table
+    db = get_db()
+    
+    # Create users table
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT UNIQUE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create policies table
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS policies (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            filename TEXT NOT NULL,
+            upload_time TIMESTAMP NOT NULL,
+            policy_type TEXT NOT NULL,
+            detected_type TEXT,
+            policy_number TEXT,
+            sum_insured TEXT,
+            premium TEXT,
+            issue_date TEXT,
+            expiry_date TEXT,
+            benefits TEXT,
+            exclusions TEXT,
+            clauses TEXT,
+            risks TEXT,
+            coverage TEXT,
+            quality_metrics TEXT,
+            coverage_risk INTEGER,
+            cost_risk INTEGER,
+            delay_risk INTEGER,
+            overall_risk REAL,
+            co_pay_percentage INTEGER,
+            deductible INTEGER,
+            room_rent_cap TEXT,
+            sub_limits TEXT,
+            text_length INTEGER,
+            page_count INTEGER,
+            file_path TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    
+    # Per-user history is filtered by user and read newest first
+    has_index = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_policies_user_time'"
+    ).fetchone()
+    if not has_index:
         db.execute('''
-            CREATE TABLE IF NOT EXISTS policies (
-                id TEXT PRIMARY KEY,
-                user_id INTEGER NOT NULL,
-                filename TEXT NOT NULL,
-                upload_time TIMESTAMP NOT NULL,
-                policy_type TEXT NOT NULL,
-                detected_type TEXT,
-                policy_number TEXT,
-                sum_insured TEXT,
-                premium TEXT,
-                issue_date TEXT,
-                expiry_date TEXT,
-                benefits TEXT,
-                exclusions TEXT,
-                clauses TEXT,
-                risks TEXT,
-                coverage TEXT,
-                quality_metrics TEXT,
-                coverage_risk INTEGER,
-                cost_risk INTEGER,
-                delay_risk INTEGER,
-                overall_risk REAL,
-                co_pay_percentage INTEGER,
-                deductible INTEGER,
-                room_rent_cap TEXT,
-                sub_limits TEXT,
-                text_length INTEGER,
-                page_count INTEGER,
-                file_path TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
+            CREATE INDEX IF NOT EXISTS idx_policies_user_time
+            ON policies (user_id, upload_time DESC)
         ''')
-        
-        db.commit()
-
-# Initialize database on startup
-init_db_schema()
+        # Gather planner statistics once so the new index gets used
+        db.execute('ANALYZE')
 
 def get_user_id(phone, name):
     """Get or create user and return user_id"""
-    with closing(get_db()) as db:
-        # Check if user exists
-        cursor = db.execute('SELECT id FROM users WHERE phone = ?', (phone,))
-        user = cursor.fetchone()
-        
-        if user:
-            return user['id']
-        else:
-            # Create new user
-            cursor = db.execute(
-                'INSERT INTO users (name, phone) VALUES (?, ?)',
-                (name, phone)
-            )
-            db.commit()
-            return cursor.lastrowid
+    db = get_db()
+    
+    # Check if user exists
+    cursor = db.execute('SELECT id FROM users WHERE phone = ?', (phone,))
+    user = cursor.fetchone()
+    
+    if user:
+        return user['id']
+    else:
+        # Create new user
+        cursor = db.execute(
+            'INSERT INTO users (name, phone) VALUES (?, ?)',
+            (name, phone)
+        )
+        return cursor.lastrowid
+
+INSERT_POLICY_SQL = '''
+    INSERT INTO policies (
+        id, user_id, filename, upload_time, policy_type, detected_type,
+        policy_number, sum_insured, premium, issue_date, expiry_date,
+        benefits, exclusions, clauses, risks, coverage, quality_metrics,
+        coverage_risk, cost_risk, delay_risk, overall_risk,
+        co_pay_percentage, deductible, room_rent_cap, sub_limits,
+        text_length, page_count, file_path
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def policy_to_row(user_id, policy_data, file_path):
+    """Flatten an analyzed policy into the column order of INSERT_POLICY_SQL"""
+    return (
+        policy_data['id'],
+        user_id,
+        policy_data['filename'],
+        policy_data['upload_time'],
+        policy_data['policy_type'],
+        policy_data.get('detected_type', ''),
+        policy_data['policy_number'],
+        policy_data['sum_insured'],
+        policy_data['premium'],
+        policy_data.get('key_dates', {}).get('issue_date', ''),
+        policy_data.get('key_dates', {}).get('expiry_date', ''),
+        _dumps(policy_data.get('benefits', [])),
+        _dumps(policy_data.get('exclusions', [])),
+        _dumps(policy_data.get('clauses', {})),
+        _dumps(policy_data.get('risks', [])),
+        _dumps(policy_data.get('coverage', {})),
+        _dumps(policy_data.get('quality_metrics', {})),
+        policy_data['risk_scores']['coverage_risk'],
+        policy_data['risk_scores']['cost_risk'],
+        policy_data['risk_scores']['delay_risk'],
+        policy_data['risk_scores']['overall_risk'],
+        policy_data['financial_details']['co_pay_percentage'],
+        policy_data['financial_details']['deductible'],
+        policy_data['financial_details']['room_rent_cap'],
+        _dumps(policy_data['financial_details']['sub_limits']),
+        policy_data['text_length'],
+        policy_data['page_count'],
+        file_path
+    )
+
+# Policies don't change after upload, so lookups by id are cached for a short while
+_policy_cache = TTLCache(maxsize=app.config['POLICY_CACHE_SIZE'], ttl=app.config['POLICY_CACHE_TTL'])
+_policy_cache_lock = threading.Lock()
+
+def _forget_policy(policy_id, user_id):
+    """Drop a policy from the lookup cache"""
+    with _policy_cache_lock:
+        _policy_cache.pop((policy_id, user_id), None)
 
 def save_policy_to_db(user_id, policy_data, file_path):
     """Save analyzed policy to database"""
-    with closing(get_db()) as db:
-        db.execute('''
-            INSERT INTO policies (
-                id, user_id, filename, upload_time, policy_type, detected_type,
-                policy_number, sum_insured, premium, issue_date, expiry_date,
-                benefits, exclusions, clauses, risks, coverage, quality_metrics,
-                coverage_risk, cost_risk, delay_risk, overall_risk,
-                co_pay_percentage, deductible, room_rent_cap, sub_limits,
-                text_length, page_count, file_path
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            policy_data['id'],
-            user_id,
-            policy_data['filename'],
-            policy_data['upload_time'],
-            policy_data['policy_type'],
-            policy_data.get('detected_type', ''),
-            policy_data['policy_number'],
-            policy_data['sum_insured'],
-            policy_data['premium'],
-            policy_data.get('key_dates', {}).get('issue_date', ''),
-            policy_data.get('key_dates', {}).get('expiry_date', ''),
-            json.dumps(policy_data.get('benefits', [])),
-            json.dumps(policy_data.get('exclusions', [])),
-            json.dumps(policy_data.get('clauses', {})),
-            json.dumps(policy_data.get('risks', [])),
-            json.dumps(policy_data.get('coverage', {})),
-            json.dumps(policy_data.get('quality_metrics', {})),
-            policy_data['risk_scores']['coverage_risk'],
-            policy_data['risk_scores']['cost_risk'],
-            policy_data['risk_scores']['delay_risk'],
-            policy_data['risk_scores']['overall_risk'],
-            policy_data['financial_details']['co_pay_percentage'],
-            policy_data['financial_details']['deductible'],
-            policy_data['financial_details']['room_rent_cap'],
-            json.dumps(policy_data['financial_details']['sub_limits']),
-            policy_data['text_length'],
-            policy_data['page_count'],
-            file_path
-        ))
-        db.commit()
-
-def get_user_policies(user_id, limit=10):
-    """Get policies for a specific user"""
-    with closing(get_db()) as db:
-        cursor = db.execute('''
-            SELECT * FROM policies 
+    get_db().execute(INSERT_POLICY_SQL, policy_to_row(user_id, policy_data, file_path))
+    _forget_policy(policy_data['id'], user_id)
+
+def _policy_from_row(row):
+    """Build a policy dict shaped like the analysis result from a policies row"""
+    return {
+        'id': row['id'],
+        'filename': row['filename'],
+        'upload_time': row['upload_time'],
+        'policy_type': row['policy_type'],
+        'detected_type': row['detected_type'],
+        'policy_number': row['policy_number'],
+        'sum_insured': row['sum_insured'],
+        'premium': row['premium'],
+        'key_dates': {
+            'issue_date': row['issue_date'],
+            'expiry_date': row['expiry_date']
+        },
+        'benefits': _loads(row['benefits']) if row['benefits'] else [],
+        'exclusions': _loads(row['exclusions']) if row['exclusions'] else [],
+        'clauses': _loads(row['clauses']) if row['clauses'] else {},
+        'risks': _loads(row['risks']) if row['risks'] else [],
+        'coverage': _loads(row['coverage']) if row['coverage'] else {},
+        'quality_metrics': _loads(row['quality_metrics']) if row['quality_metrics'] else {},
+        'risk_scores': {
+            'coverage_risk': row['coverage_risk'],
+            'cost_risk': row['cost_risk'],
+            'delay_risk': row['delay_risk'],
+            'overall_risk': row['overall_risk']
+        },
+        'financial_details': {
+            'co_pay_percentage': row['co_pay_percentage'],
+            'deductible': row['deductible'],
+            'room_rent_cap': row['room_rent_cap'],
+            'sub_limits': _loads(row['sub_limits']) if row['sub_limits'] else {}
+        },
+        'text_length': row['text_length'],
+        'page_count': row['page_count'],
+        'file_path': row['file_path']
+    }
+
+def get_user_policy_summaries(user_id, limit=10):
+    """Get lightweight policy summaries for a user's history list"""
+    db = get_db()
+    cursor = db.execute('''
+        SELECT id, filename, upload_time, detected_type, policy_type,
+               coverage_risk, cost_risk, delay_risk, overall_risk
+        FROM policies 
+        WHERE user_id = ? 
+        ORDER BY upload_time DESC 
+        LIMIT ?
+    ''', (user_id, limit))
+    
+    summaries = []
+    for row in cursor:
+        summaries.append({
+            'id': row['id'],
+            'filename': row['filename'],
+            'upload_time': row['upload_time'],
+            'detected_type': row['detected_type'],
+            'policy_type': row['policy_type'],
+            'risk_scores': {
+                'coverage_risk': row['coverage_risk'],
+                'cost_risk': row['cost_risk'],
+                'delay_risk': row['delay_risk'],
+                'overall_risk': row['overall_risk']
+            }
+        })
+    
+    return summaries
+
+def get_user_policy_stats(user_id, limit=100):
+    """Aggregate a user's most recent policies by type and risk bucket in SQL"""
+    db = get_db()
+    groups = db.execute('''
+        SELECT policy_type,
+               CASE WHEN overall_risk <= 30 THEN 0
+                    WHEN overall_risk <= 60 THEN 1
+                    WHEN overall_risk <= 80 THEN 2
+                    ELSE 3 END AS bucket,
+               COUNT(*) AS policy_count,
+               SUM(overall_risk) AS total_risk,
+               MAX(upload_time) AS latest_upload
+        FROM (
+            SELECT policy_type, overall_risk, upload_time
+            FROM policies 
             WHERE user_id = ? 
             ORDER BY upload_time DESC 
             LIMIT ?
-        ''', (user_id, limit))
-        
-        policies = []
-        for row in cursor.fetchall():
-            policy = dict(row)
-            # Parse JSON fields
-            policy['benefits'] = json.loads(policy['benefits']) if policy['benefits'] else []
-            policy['exclusions'] = json.loads(policy['exclusions']) if policy['exclusions'] else []
-            policy['clauses'] = json.loads(policy['clauses']) if policy['clauses'] else {}
-            policy['risks'] = json.loads(policy['risks']) if policy['risks'] else []
-            policy['coverage'] = json.loads(policy['coverage']) if policy['coverage'] else {}
-            policy['quality_metrics'] = json.loads(policy['quality_metrics']) if policy['quality_metrics'] else {}
-            policy['sub_limits'] = json.loads(policy['sub_limits']) if policy['sub_limits'] else {}
-            
-            # Reconstruct risk_scores
-            policy['risk_scores'] = {
-                'coverage_risk': policy['coverage_risk'],
-                'cost_risk': policy['cost_risk'],
-                'delay_risk': policy['delay_risk'],
-                'overall_risk': policy['overall_risk']
-            }
-            
-            # Reconstruct financial_details
-            policy['financial_details'] = {
-                'co_pay_percentage': policy['co_pay_percentage'],
-                'deductible': policy['deductible'],
-                'room_rent_cap': policy['room_rent_cap'],
-                'sub_limits': policy['sub_limits']
-            }
-            
-            # Reconstruct key_dates
-            policy['key_dates'] = {
-                'issue_date': policy['issue_date'],
-                'expiry_date': policy['expiry_date']
-            }
-            
-            policies.append(policy)
-        
-        return policies
+        )
+        GROUP BY policy_type, bucket
+        ORDER BY latest_upload DESC
+    ''', (user_id, limit)).fetchall()
+    
+    recent = db.execute('''
+        SELECT id, policy_type, overall_risk, upload_time
+        FROM policies 
+        WHERE user_id = ? 
+        ORDER BY upload_time DESC 
+        LIMIT 5
+    ''', (user_id,)).fetchall()
+    
+    return groups, recent
 
 def get_policy_by_id(policy_id, user_id):
-    """Get specific policy for a user"""
-    with closing(get_db()) as db:
-        cursor = db.execute('''
-            SELECT * FROM policies 
-            WHERE id = ? AND user_id = ?
-        ''', (policy_id, user_id))
-        
-        row = cursor.fetchone()
-        if not row:
-            return None
-        
-        policy = dict(row)
-        # Parse JSON fields
-        policy['benefits'] = json.loads(policy['benefits']) if policy['benefits'] else []
-        policy['exclusions'] = json.loads(policy['exclusions']) if policy['exclusions'] else []
-        policy['clauses'] = json.loads(policy['clauses']) if policy['clauses'] else {}
-        policy['risks'] = json.loads(policy['risks']) if policy['risks'] else []
-        policy['coverage'] = json.loads(policy['coverage']) if policy['coverage'] else {}
-        policy['quality_metrics'] = json.loads(policy['quality_metrics']) if policy['quality_metrics'] else {}
-        policy['sub_limits'] = json.loads(policy['sub_limits']) if policy['sub_limits'] else {}
-        
-        # Reconstruct risk_scores
-        policy['risk_scores'] = {
-            'coverage_risk': policy['coverage_risk'],
-            'cost_risk': policy['cost_risk'],
-            'delay_risk': policy['delay_risk'],
-            'overall_risk': policy['overall_risk']
-        }
-        
-        # Reconstruct financial_details
-        policy['financial_details'] = {
-            'co_pay_percentage': policy['co_pay_percentage'],
-            'deductible': policy['deductible'],
-            'room_rent_cap': policy['room_rent_cap'],
-            'sub_limits': policy['sub_limits']
-        }
-        
-        # Reconstruct key_dates
-        policy['key_dates'] = {
-            'issue_date': policy['issue_date'],
-            'expiry_date': policy['expiry_date']
-        }
-        
-        return policy
+    """Get specific policy for a user, from the cache when it was read recently"""
+    key = (policy_id, user_id)
+    with _policy_cache_lock:
+        policy = _policy_cache.get(key)
+    
+    if policy is None:
+        policy = _load_policy(policy_id, user_id)
+        if policy is not None:
+            with _policy_cache_lock:
+                _policy_cache[key] = policy
+    
+    return policy
+
+def _load_policy(policy_id, user_id):
+    """Read a single policy for a user from the database"""
+    db = get_db()
+    cursor = db.execute('''
+        SELECT * FROM policies 
+        WHERE id = ? AND user_id = ?
+    ''', (policy_id, user_id))
+    
+    row = cursor.fetchone()
+    if not row:
+        return None
+    
+    return _policy_from_row(row)
+
+def get_policies_by_ids(policy_ids, user_id):
+    """Get several of a user's policies in one query, in the order requested"""
+    placeholders = ','.join('?' * len(policy_ids))
+    cursor = get_db().execute(f'''
+        SELECT * FROM policies 
+        WHERE user_id = ? AND id IN ({placeholders})
+    ''', (user_id, *policy_ids))
+    
+    policies = {row['id']: _policy_from_row(row) for row in cursor}
+    return [policies[policy_id] for policy_id in dict.fromkeys(policy_ids) if policy_id in policies]
+
+def get_policy_risk_summary(policy_ids, user_id):
+    """Aggregate risk scores over several of a user's policies in SQL"""
+    placeholders = ','.join('?' * len(policy_ids))
+    return get_db().execute(f'''
+        SELECT AVG(coverage_risk) AS avg_coverage_risk,
+               AVG(cost_risk) AS avg_cost_risk,
+               AVG(delay_risk) AS avg_delay_risk,
+               MIN(overall_risk) AS min_overall,
+               MAX(overall_risk) AS max_overall
+        FROM policies 
+        WHERE user_id = ? AND id IN ({placeholders})
+    ''', (user_id, *policy_ids)).fetchone()
+
+def content_key(data):
+    """Fingerprint bytes for de-duplication and cache keys (not for security)"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    _, sep, ext = filename.rpartition('.')
+    return bool(sep) and ext.lower() in ALLOWED_EXTENSIONS
 
 def login_required(f):
     """Decorator to require login for routes"""
@@ -376,696 +525,115 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-class RiskPredictor:
-    """ML-based risk prediction model"""
-    
-    @staticmethod
-    def extract_features(text):
-        """Extract numerical features from text"""
-        text_lower = text.lower()
-        features = {}
-        
-        # 1. Count specific keywords (each gives different weight)
-        keywords = {
-            'waiting_period': ['waiting period', 'waiting time', 'cooling period'],
-            'exclusion': ['exclusion', 'not covered', 'excluded', 'not payable'],
-            'co_pay': ['co-pay', 'copay', 'coinsurance', 'payable by insured'],
-            'sub_limit': ['sub-limit', 'sublimit', 'cap of', 'maximum limit'],
-            'room_rent': ['room rent', 'room charges', 'accommodation'],
-            'pre_existing': ['pre-existing', 'preexisting', 'existing condition'],
-            'claim_days': ['within 24 hours', 'within 48 hours', 'immediately'],
-            'deductible': ['deductible', 'excess amount', 'first pay'],
-            'disease': ['cancer', 'diabetes', 'heart', 'kidney', 'liver', 'hiv'],
-            'surgery': ['surgery', 'operation', 'procedure', 'treatment'],
-            'hospital': ['hospital', 'medical', 'healthcare', 'clinic'],
-            'percentage': ['%', 'percent', 'percentage'],
-            'money': ['rupees', 'rs', 'inr', 'lakh', 'thousand'],
-            'time': ['day', 'days', 'month', 'months', 'year', 'years'],
-            'limit': ['limit', 'capped', 'maximum', 'upto']
-        }
-        
-        for key, words in keywords.items():
-            count = sum(text_lower.count(word) for word in words)
-            features[key] = count
-        
-        # 2. Find percentages
-        percentages = re.findall(r'(\d+)%', text_lower)
-        features['avg_percentage'] = np.mean([int(p) for p in percentages]) if percentages else 0
-        
-        # 3. Find monetary values
-        amounts = re.findall(r'rs\.?\s*(\d+)|₹\s*(\d+)', text_lower)
-        flat_amounts = []
-        for match in amounts:
-            for val in match:
-                if val:
-                    flat_amounts.append(int(val))
-        features['avg_amount'] = np.mean(flat_amounts) if flat_amounts else 0
-        
-        # 4. Find time periods
-        days = re.findall(r'(\d+)\s*(day|days)', text_lower)
-        months = re.findall(r'(\d+)\s*(month|months)', text_lower)
-        years = re.findall(r'(\d+)\s*(year|years)', text_lower)
-        
-        features['has_days'] = len(days)
-        features['has_months'] = len(months)
-        features['has_years'] = len(years)
-        
-        # 5. Document complexity (longer = more complex = higher risk)
-        features['length'] = min(len(text) / 1000, 10)  # Normalize
-        
-        return features
-    
-    @staticmethod
-    def predict_risk(text, policy_type, age, has_disease):
-        """Predict risk scores based on document features"""
-        features = RiskPredictor.extract_features(text)
-        
-        # Coverage Risk (based on exclusions, waiting periods, disease mentions)
-        coverage_risk = 20  # Base
-        
-        coverage_risk += features['waiting_period'] * 8
-        coverage_risk += features['exclusion'] * 10
-        coverage_risk += features['pre_existing'] * 12
-        coverage_risk += features['disease'] * 5
-        coverage_risk += features['has_years'] * 5
-        
-        # Adjust by policy type
-        if policy_type == "Health Insurance":
-            coverage_risk += 10  # Health policies have more exclusions
-        elif policy_type == "Car Insurance":
-            coverage_risk -= 10
-        elif policy_type == "Life Insurance":
-            coverage_risk -= 5
-        
-        # Cost Risk (based on co-pay, sub-limits, percentages)
-        cost_risk = 15  # Base
-        
-        cost_risk += features['co_pay'] * 12
-        cost_risk += features['sub_limit'] * 10
-        cost_risk += features['room_rent'] * 8
-        cost_risk += features['percentage'] * 5
-        cost_risk += features['money'] * 3
-        cost_risk += features['deductible'] * 10
-        
-        # Add percentage impact
-        cost_risk += features['avg_percentage'] * 1.5
-        
-        # Delay Risk (based on claim conditions, time limits)
-        delay_risk = 10  # Base
-        
-        delay_risk += features['claim_days'] * 15
-        delay_risk += features['time'] * 4
-        delay_risk += features['has_days'] * 8
-        delay_risk += features['has_months'] * 5
-        
-        # Add user profile impact
-        if age > 60:
-            coverage_risk += 15
-            delay_risk += 10
-        elif age > 45:
-            coverage_risk += 8
-            delay_risk += 5
-        
-        if has_disease:
-            coverage_risk += 20
-            cost_risk += 10
-        
-        # Ensure within 0-100
-        coverage_risk = min(max(int(coverage_risk), 0), 100)
-        cost_risk = min(max(int(cost_risk), 0), 100)
-        delay_risk = min(max(int(delay_risk), 0), 100)
-        
-        return {
-            'coverage_risk': coverage_risk,
-            'cost_risk': cost_risk,
-            'delay_risk': delay_risk
-        }
-    
-    @staticmethod
-    def extract_co_pay_percentage(text):
-        """Extract co-pay percentage from policy text"""
-        text_lower = text.lower()
-        
-        patterns = [
-            r'co[-\s]?pay[:\s]*(\d+)%',
-            r'copayment[:\s]*(\d+)%',
-            r'co[-\s]?insurance[:\s]*(\d+)%',
-            r'payable by insured[:\s]*(\d+)%',
-            r'(\d+)%\s*co[-\s]?pay',
-            r'(\d+)%\s*copayment',
-            r'(\d+)%\s*co-insurance'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                return int(match.group(1))
-        
-        # Check for generic mentions of co-pay without percentage
-        if 'co-pay' in text_lower or 'copay' in text_lower or 'co-payment' in text_lower:
-            return 10  # Default if co-pay exists but no percentage mentioned
-        
-        return 0
-    
-    @staticmethod
-    def extract_deductible(text):
-        """Extract deductible amount from policy text"""
-        text_lower = text.lower()
-        
-        patterns = [
-            r'deductible[:\s]*rs\.?\s*(\d+)|deductible[:\s]*₹\s*(\d+)',
-            r'excess[:\s]*rs\.?\s*(\d+)|excess[:\s]*₹\s*(\d+)',
-            r'first pay[:\s]*rs\.?\s*(\d+)|first pay[:\s]*₹\s*(\d+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                for val in match.groups():
-                    if val:
-                        return int(val)
-        
-        return 0
-    
-    @staticmethod
-    def extract_room_rent_cap(text):
-        """Extract room rent capping from policy text"""
-        text_lower = text.lower()
-        
-        patterns = [
-            r'room rent[:\s]*rs\.?\s*(\d+)|room rent[:\s]*₹\s*(\d+)',
-            r'room charges[:\s]*rs\.?\s*(\d+)|room charges[:\s]*₹\s*(\d+)',
-            r'accommodation[:\s]*rs\.?\s*(\d+)|accommodation[:\s]*₹\s*(\d+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                for val in match.groups():
-                    if val:
-                        return val
-        
-        # Check for percentage-based room rent capping
-        percent_match = re.search(r'room rent[:\s]*(\d+)%', text_lower)
-        if percent_match:
-            return percent_match.group(1) + "%"
-        
-        return None
-    
-    @staticmethod
-    def extract_sub_limits(text):
-        """Extract various sub-limits from policy text"""
-        text_lower = text.lower()
-        sub_limits = {}
-        
-        # Common sub-limits
-        limit_types = {
-            'icu': r'icu[:\s]*rs\.?\s*(\d+)|icu[:\s]*₹\s*(\d+)',
-            'surgery': r'surgery[:\s]*rs\.?\s*(\d+)|surgery[:\s]*₹\s*(\d+)',
-            'doctor': r'doctor[:\s]*rs\.?\s*(\d+)|doctor[:\s]*₹\s*(\d+)',
-            'medicine': r'medicine[:\s]*rs\.?\s*(\d+)|medicine[:\s]*₹\s*(\d+)',
-            'diagnostic': r'diagnostic[:\s]*rs\.?\s*(\d+)|diagnostic[:\s]*₹\s*(\d+)'
-        }
-        
-        for limit_type, pattern in limit_types.items():
-            match = re.search(pattern, text_lower)
-            if match:
-                for val in match.groups():
-                    if val:
-                        sub_limits[limit_type] = int(val)
-        
-        return sub_limits
-
-class PolicyAnalyzer:
-    """Enhanced policy analysis engine"""
-    
-    # Comprehensive policy type database
-    POLICY_TYPES = {
-        "Health Insurance": {
-            'keywords': ['health', 'medical', 'hospital', 'surgery', 'disease', 'treatment', 'doctor', 
-                        'medicine', 'clinical', 'diagnosis', 'patient', 'healthcare', 'policy', 'insurance', 
-                        'cover', 'benefits', 'cashless', 'reimbursement', 'room rent', 'icu', 'pre-existing',
-                        'waiting period', 'copay', 'day care', 'hospitalization'],
-            'weight': 1.5,
-            'color': '#FF6B6B',
-            'icon': '🏥'
-        },
-        "Car Insurance": {
-            'keywords': ['car', 'vehicle', 'motor', 'automobile', 'accident', 'drive', 'driver', 'collision', 
-                        'repair', 'garage', 'road', 'traffic', 'third party', 'comprehensive', 'own damage',
-                        'theft', 'liability', 'no claim bonus', 'depreciation', 'towing', 'tire', 'engine'],
-            'weight': 1.5,
-            'color': '#4ECDC4',
-            'icon': '🚗'
-        },
-        "Life Insurance": {
-            'keywords': ['life', 'death', 'term', 'maturity', 'nominee', 'beneficiary', 'assured', 'policyholder', 
-                        'premium', 'sum assured', 'survival', 'mortality', 'endowment', 'whole life', 'riders',
-                        'critical illness', 'accidental death', 'disability', 'income benefit'],
-            'weight': 1.5,
-            'color': '#45B7D1',
-            'icon': '💚'
-        },
-        "Travel Insurance": {
-            'keywords': ['travel', 'trip', 'flight', 'baggage', 'overseas', 'foreign', 'passport', 'journey', 
-                        'tour', 'abroad', 'holiday', 'vacation', 'airline', 'trip cancellation', 'delay',
-                        'lost luggage', 'emergency evacuation', 'travel assistance'],
-            'weight': 1.5,
-            'color': '#96CEB4',
-            'icon': '✈️'
-        },
-        "Home Insurance": {
-            'keywords': ['home', 'house', 'property', 'building', 'contents', 'fire', 'theft', 'flood', 
-                        'earthquake', 'residence', 'household', 'structure', 'burglary', 'natural disaster',
-                        'personal belongings', 'liability', 'renovation'],
-            'weight': 1.5,
-            'color': '#FFE194',
-            'icon': '🏠'
-        },
-        "Bike Insurance": {
-            'keywords': ['bike', 'motorcycle', 'two wheeler', 'scooter', 'helmet', 'rider', 'biking', 
-                        'motorcycling', 'two-wheeler', 'accessories', 'pillion', 'comprehensive'],
-            'weight': 1.5,
-            'color': '#D4A5A5',
-            'icon': '🏍️'
-        }
-    }
-    
-    @staticmethod
-    def extract_policy_type(text):
-        """Enhanced policy type detection with confidence scoring"""
-        text_lower = text.lower()
-        
-        scores = {}
-        keyword_matches = defaultdict(list)
-        
-        for p_type, data in PolicyAnalyzer.POLICY_TYPES.items():
-            score = 0
-            for keyword in data['keywords']:
-                count = text_lower.count(keyword)
-                if count > 0:
-                    score += count * data['weight']
-                    keyword_matches[p_type].append(keyword)
-            scores[p_type] = score
-        
-        # Sort by score
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        
-        # Calculate confidence
-        total_score = sum(scores.values()) or 1
-        results = []
-        
-        for p_type, score in sorted_scores:
-            confidence = (score / total_score) * 100
-            if confidence > 5:  # Only include meaningful matches
-                results.append({
-                    'type': p_type,
-                    'confidence': round(confidence, 1),
-                    'score': score,
-                    'matched_keywords': keyword_matches[p_type][:5]  # Top 5 keywords
-                })
-        
-        return results
-    
-    @staticmethod
-    def extract_sum_insured(text):
-        """Extract sum insured with multiple patterns"""
-        text_lower = text.lower()
-        
-        patterns = [
-            r'(?:sum\s*insured|cover|coverage|sum\s*assured)[:\s]*(?:rs\.?|₹)?\s*([\d,]+(?:\.\d{1,2})?)\s*(?:lakh|lac|crore|million|thousand)?',
-            r'(?:policy\s*amount|cover\s*amount|benefit\s*amount)[:\s]*(?:rs\.?|₹)?\s*([\d,]+(?:\.\d{1,2})?)',
-            r'(?:liability|maximum\s*benefit)[:\s]*(?:of)?\s*(?:rs\.?|₹)?\s*([\d,]+(?:\.\d{1,2})?)',
-            r'up\s*to\s*(?:rs\.?|₹)?\s*([\d,]+(?:\.\d{1,2})?)',
-            r'cover\s*of\s*(?:rs\.?|₹)?\s*([\d,]+(?:\.\d{1,2})?)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text_lower, re.I)
-            if match:
-                amount = match.group(1).replace(',', '')
-                # Check for lakh/crore suffixes
-                suffix_match = re.search(r'(?:lakh|lac|crore|million|thousand)', text_lower[match.end():match.end()+10])
-                if suffix_match:
-                    suffix = suffix_match.group()
-                    if 'lakh' in suffix or 'lac' in suffix:
-                        amount = str(float(amount) * 100000)
-                    elif 'crore' in suffix:
-                        amount = str(float(amount) * 10000000)
-                    elif 'million' in suffix:
-                        amount = str(float(amount) * 1000000)
-                    elif 'thousand' in suffix:
-                        amount = str(float(amount) * 1000)
-                return amount
-        
-        return "Not specified"
-    
-    @staticmethod
-    def extract_premium(text):
-        """Extract premium amount with multiple patterns"""
-        text_lower = text.lower()
-        
-        patterns = [
-            r'(?:premium|annual\s*premium|yearly\s*premium)[:\s]*(?:rs\.?|₹)?\s*([\d,]+(?:\.\d{1,2})?)',
-            r'(?:policy\s*fee|installment|payment)[:\s]*(?:rs\.?|₹)?\s*([\d,]+(?:\.\d{1,2})?)',
-            r'(?:pay|payable|charged)[:\s]*(?:rs\.?|₹)?\s*([\d,]+(?:\.\d{1,2})?)\s*(?:per\s*annum|annually|yearly)',
-            r'premium\s*amount[:\s]*(?:rs\.?|₹)?\s*([\d,]+(?:\.\d{1,2})?)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text_lower, re.I)
-            if match:
-                return match.group(1).replace(',', '')
-        
-        return "Not specified"
+# Text analysis cache
+_analysis_cache = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+
+_analysis_pool = None
+_analysis_pool_lock = threading.Lock()
+
+def get_analysis_pool():
+    """Get the process pool used for PDF analysis, starting it on first use"""
+    global _analysis_pool
+    with _analysis_pool_lock:
+        if _analysis_pool is None:
+            # spawn rather than fork so workers don't inherit threads, DB connections or matplotlib state
+            _analysis_pool = ProcessPoolExecutor(
+                max_workers=app.config['ANALYSIS_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _analysis_pool
+
+def _run_analysis(pdf_bytes, attempts=2):
+    """Run analyze_pdf in the worker pool, replacing the pool if a worker dies"""
+    global _analysis_pool
+    for attempt in range(attempts):
+        pool = get_analysis_pool()
+        try:
+            return pool.submit(analyze_pdf, pdf_bytes).result()
+        except BrokenProcessPool:
+            # A dead worker leaves the whole pool unusable, so start a fresh one
+            logger.warning("Analysis worker died, restarting the analysis pool")
+            with _analysis_pool_lock:
+                if _analysis_pool is pool:
+                    _analysis_pool = None
+            pool.shutdown(wait=False)
+            if attempt == attempts - 1:
+                raise
+
+def get_pdf_analysis(pdf_bytes):
+    """Get (page_count, analysis) for a PDF, reusing the cached result for identical files"""
+    key = content_key(pdf_bytes)
     
-    @staticmethod
-    def extract_key_dates(text):
-        """Extract important policy dates"""
-        text_lower = text.lower()
-        dates = {}
-        
-        # Policy issue date
-        issue_patterns = [
-            r'(?:policy\s*issued?|date\s*of\s*issue|issued?\s*on)[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
-            r'(?:commencement|commencing|start)[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'
-        ]
-        
-        for pattern in issue_patterns:
-            match = re.search(pattern, text_lower, re.I)
-            if match:
-                dates['issue_date'] = match.group(1)
-                break
-        
-        # Expiry date
-        expiry_patterns = [
-            r'(?:expir|valid|validity|expiry)[:\s]*(?:date)?[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
-            r'(?:valid\s*until|expires?\s*on)[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'
-        ]
-        
-        for pattern in expiry_patterns:
-            match = re.search(pattern, text_lower, re.I)
-            if match:
-                dates['expiry_date'] = match.group(1)
-                break
-        
-        return dates
+    with _analysis_cache_lock:
+        cached = _analysis_cache.get(key)
+        if cached is not None:
+            _analysis_cache.move_to_end(key)
+            return cached
     
-    @staticmethod
-    def extract_benefits(text):
-        """Extract key benefits from policy"""
-        text_lower = text.lower()
-        benefits = []
-        
-        benefit_keywords = [
-            (r'(?:covers?|coverage\s*for|benefit\s*of)\s+([^.]{10,50})\.', 'coverage'),
-            (r'(?:includes?|inclusions?)[:\s]+([^.]{10,50})\.', 'inclusion'),
-            (r'(?:provides?|offer|offering)[:\s]+([^.]{10,50})\.', 'benefit')
-        ]
-        
-        for pattern, benefit_type in benefit_keywords:
-            matches = re.findall(pattern, text_lower, re.I)
-            for match in matches[:3]:  # Limit per type
-                if len(match) > 15 and match not in [b['text'] for b in benefits]:
-                    benefits.append({
-                        'text': match.strip().capitalize(),
-                        'type': benefit_type
-                    })
-        
-        return benefits[:8]  # Return top 8 benefits
+    # Extraction and the regex/keyword sweeps are CPU-bound, so run them outside this process
+    text, page_count, analysis = _run_analysis(pdf_bytes)
+    if analysis is None:
+        return page_count, None  # No extractable text
     
-    @staticmethod
-    def extract_exclusions(text):
-        """Enhanced exclusion extraction"""
-        text_lower = text.lower()
-        exclusions = []
-        
-        exclusion_patterns = [
-            r'(?:not\s+cover(?:ed)?|exclusion|excluded)[^.]*\.',
-            r'(?:will\s+not\s+pay|not\s+liable)[^.]*\.',
-            r'(?:does\s+not\s+apply|not\s+included)[^.]*\.',
-            r'(?:limitations?|restrictions?)[^.]*\.',
-            r'(?:waiting\s+period)[^.]*\.',
-            r'(?:pre-existing\s+condition)[^.]*\.'
-        ]
-        
-        for pattern in exclusion_patterns:
-            matches = re.findall(pattern, text_lower, re.I)
-            for match in matches:
-                clean_match = match.strip()
-                # Clean up the text
-                clean_match = re.sub(r'\s+', ' ', clean_match)
-                if len(clean_match) > 15 and clean_match not in exclusions:
-                    exclusions.append(clean_match.capitalize())
-        
-        return list(dict.fromkeys(exclusions))[:8]  # Remove duplicates, keep 8
+    # Everything the route needs from the text goes into the analysis, so the text isn't cached
+    analysis['text_length'] = len(text)
+    analysis['ai_extracted'] = ai_extract_policy_details(text)
     
-    @staticmethod
-    def extract_key_clauses(text):
-        """Extract key clauses from policy text"""
-        text_lower = text.lower()
-        clauses = {}
-        
-        terms = {
-            "waiting period": r'waiting[-\s]?period|waiting\s+time|pre[-\s]?existing\s+waiting',
-            "exclusion": r'exclusion|not\s+cover|will\s+not\s+cover|excluded|not\s+payable',
-            "co-pay": r'co[-\s]?pay|copayment|co-payment|coinsurance',
-            "sub-limit": r'sub[-\s]?limit|sublimit|limit\s+of\s+coverage|cap\s+of',
-            "room rent": r'room\s+rent|room\s+charges|accommodation\s+benefit',
-            "pre-existing": r'pre[-\s]?existing|preexisting|known\s+condition',
-            "claim": r'claim\s+process|claim\s+filing|intimation|claim\s+settlement',
-            "deductible": r'deductible|excess|first\s+pay'
-        }
-        
-        for term, pattern in terms.items():
-            sentences = [s for s in text.split('.') if re.search(pattern, s.lower())]
-            if sentences:
-                clauses[term] = sentences[0].strip() + "."
-            else:
-                clauses[term] = "Not mentioned in document"
-        
-        return clauses
+    # Don't pin a failed AI extraction; the next upload of this file tries again
+    if client is None or analysis['ai_extracted'] is not None:
+        with _analysis_cache_lock:
+            _analysis_cache[key] = (page_count, analysis)
+            if len(_analysis_cache) > app.config['ANALYSIS_CACHE_SIZE']:
+                _analysis_cache.popitem(last=False)
     
-    @staticmethod
-    def analyze_policy_quality(text):
-        """Analyze policy quality metrics"""
-        text_lower = text.lower()
-        
-        metrics = {
-            'clarity': 0,
-            'comprehensiveness': 0,
-            'transparency': 0
-        }
-        
-        # Clarity indicators
-        clarity_indicators = [
-            'clear', 'simple', 'understand', 'easy', 'plain',
-            'explain', 'described', 'definition', 'meaning'
-        ]
-        clarity_score = sum(text_lower.count(ind) for ind in clarity_indicators)
-        metrics['clarity'] = min(100, clarity_score * 10)
-        
-        # Comprehensiveness indicators
-        comprehensive_indicators = [
-            'comprehensive', 'complete', 'full', 'extensive', 'broad',
-            'wide', 'range', 'variety', 'multiple', 'various'
-        ]
-        comprehensive_score = sum(text_lower.count(ind) for ind in comprehensive_indicators)
-        metrics['comprehensiveness'] = min(100, comprehensive_score * 10)
-        
-        # Transparency indicators
-        transparency_indicators = [
-            'transparent', 'disclose', 'disclosure', 'clear', 'explicit',
-            'specifically', 'detailed', 'details', 'specific', 'particular'
-        ]
-        transparency_score = sum(text_lower.count(ind) for ind in transparency_indicators)
-        metrics['transparency'] = min(100, transparency_score * 10)
-        
-        return metrics
-    
-    @staticmethod
-    def analyze_risk_factors(text, age, disease):
-        """Enhanced risk analysis"""
-        text_lower = text.lower()
-        risk_factors = []
-        
-        # Age factor with detailed analysis
-        if age > 60:
-            risk_factors.append({
-                "factor": "Age", 
-                "impact": "High", 
-                "score": 85,
-                "description": "Age above 60 significantly increases claim scrutiny and premium",
-                "recommendation": "Consider policies with lower age restrictions or senior citizen plans"
-            })
-        elif age > 50:
-            risk_factors.append({
-                "factor": "Age", 
-                "impact": "Medium-High", 
-                "score": 65,
-                "description": "Age between 50-60 may affect premium and coverage options",
-                "recommendation": "Review age-related clauses and premium loading carefully"
-            })
-        elif age > 40:
-            risk_factors.append({
-                "factor": "Age", 
-                "impact": "Medium", 
-                "score": 45,
-                "description": "Moderate age-related risk factors to consider",
-                "recommendation": "Standard age-related considerations apply"
-            })
-        
-        # Disease factor with detailed analysis
-        if disease and disease.lower() != 'none':
-            disease_lower = disease.lower()
-            if any(term in disease_lower for term in ['diabetes', 'blood pressure', 'heart', 'cancer', 'thyroid']):
-                risk_factors.append({
-                    "factor": "Pre-existing condition", 
-                    "impact": "Critical", 
-                    "score": 90,
-                    "description": f"History of {disease} will significantly impact coverage and may have long waiting periods",
-                    "recommendation": "Look for policies with shorter waiting periods for pre-existing conditions"
-                })
-            else:
-                risk_factors.append({
-                    "factor": "Pre-existing condition", 
-                    "impact": "High", 
-                    "score": 75,
-                    "description": f"History of {disease} may affect coverage and require waiting periods",
-                    "recommendation": "Check waiting period clauses and sub-limits for this condition"
-                })
-        
-        # Exclusion analysis
-        exclusion_count = len(re.findall(r'exclusion|not\s+cover|excluded', text_lower))
-        if exclusion_count > 8:
-            risk_factors.append({
-                "factor": "High exclusion count", 
-                "impact": "High", 
-                "score": 80,
-                "description": f"Policy contains {exclusion_count} exclusion-related terms - higher than average",
-                "recommendation": "Review all exclusions carefully; consider if coverage gaps exist"
-            })
-        elif exclusion_count > 4:
-            risk_factors.append({
-                "factor": "Moderate exclusions", 
-                "impact": "Medium", 
-                "score": 50,
-                "description": f"Policy contains {exclusion_count} exclusion-related terms",
-                "recommendation": "Understand key exclusions that may affect your specific needs"
-            })
-        
-        # Waiting period analysis
-        waiting_period = PolicyAnalyzer.extract_waiting_period(text)
-        if "year" in waiting_period.lower():
-            years = re.search(r'(\d+)', waiting_period)
-            if years and int(years.group(1)) > 2:
-                risk_factors.append({
-                    "factor": "Long waiting period", 
-                    "impact": "High", 
-                    "score": 75,
-                    "description": f"Long waiting period of {waiting_period} before full coverage applies",
-                    "recommendation": "Consider if you can wait this period for claims; check for shorter alternatives"
-                })
-        elif "month" in waiting_period.lower():
-            risk_factors.append({
-                "factor": "Waiting period applies", 
-                "impact": "Medium", 
-                "score": 40,
-                "description": f"Waiting period of {waiting_period} applies for certain conditions",
-                "recommendation": "Plan healthcare needs around the waiting period"
-            })
-        
-        # Co-pay analysis
-        copay = RiskPredictor.extract_co_pay_percentage(text)
-        if copay > 30:
-            risk_factors.append({
-                "factor": "Very high co-pay", 
-                "impact": "Critical", 
-                "score": 90,
-                "description": f"High co-pay of {copay}% means significant out-of-pocket expenses",
-                "recommendation": "Consider policies with lower co-pay or build savings for co-pay amount"
-            })
-        elif copay > 20:
-            risk_factors.append({
-                "factor": "High co-pay", 
-                "impact": "High", 
-                "score": 70,
-                "description": f"Co-pay of {copay}% requires substantial out-of-pocket payment",
-                "recommendation": "Budget for co-pay amounts and check if co-pay applies to all claims"
-            })
-        elif copay > 10:
-            risk_factors.append({
-                "factor": "Moderate co-pay", 
-                "impact": "Medium", 
-                "score": 40,
-                "description": f"Co-pay of {copay}% applies",
-                "recommendation": "Standard co-pay arrangement; plan for this expense"
-            })
-        
-        # Deductible analysis
-        deductible = RiskPredictor.extract_deductible(text)
-        if deductible > 50000:
-            risk_factors.append({
-                "factor": "High deductible", 
-                "impact": "High", 
-                "score": 75,
-                "description": f"Deductible of ₹{deductible:,} must be paid before coverage starts",
-                "recommendation": "Ensure you have funds available for the deductible amount"
-            })
-        elif deductible > 10000:
-            risk_factors.append({
-                "factor": "Moderate deductible", 
-                "impact": "Medium", 
-                "score": 45,
-                "description": f"Deductible of ₹{deductible:,} applies per claim",
-                "recommendation": "Plan for this out-of-pocket expense per claim"
-            })
-        
-        return risk_factors
-    
-    @staticmethod
-    def extract_waiting_period(text):
-        """Enhanced waiting period extraction"""
-        text_lower = text.lower()
-        
-        patterns = [
-            r'waiting\s*period\s*(?:of)?\s*(\d+)\s*(day|days|month|months|year|years)',
-            r'(\d+)\s*(day|days|month|months|year|years)\s+waiting\s*period',
-            r'initial\s+waiting\s+period\s*(?:of)?\s*(\d+)\s*(day|days|month|months|year|years)?',
-            r'waiting\s+period\s+applicable\s*(?:for)?\s*(\d+)\s*(day|days|month|months|year|years)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text_lower, re.I)
-            if match:
-                if len(match.groups()) == 2:
-                    return f"{match.group(1)} {match.group(2)}"
-                else:
-                    return f"{match.group(1)} months" if match.group(1) else "Initial period applies"
-        
-        # Check if waiting period mentioned but no duration
-        if 'waiting period' in text_lower:
-            return "Mentioned (duration not specified)"
-        
-        return "Not specified"
+    return page_count, analysis
+
+# Charts render on their own threads, each drawing on its own figure
+chart_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix='charts')
+_chart_local = threading.local()
+
+def _chart_axes(figsize):
+    """Get this thread's reusable figure, resized and cleared, with fresh axes"""
+    fig = getattr(_chart_local, 'figure', None)
+    if fig is None:
+        # Imported here so workers that never draw charts don't load matplotlib
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(dpi=72)
+        FigureCanvasAgg(fig)
+        _chart_local.figure = fig
     
-    @staticmethod
-    def calculate_risk_score(age, disease, risk_factors, coverage, ml_risks):
-        """Calculate comprehensive risk score using ML predictions"""
-        # Use ML predicted risks as base
-        coverage_risk = ml_risks.get('coverage_risk', 50)
-        cost_risk = ml_risks.get('cost_risk', 50)
-        delay_risk = ml_risks.get('delay_risk', 50)
-        
-        # Weighted average for overall risk
-        overall_risk = (coverage_risk * 0.4 + cost_risk * 0.35 + delay_risk * 0.25)
-        
-        return {
-            'coverage_risk': coverage_risk,
-            'cost_risk': cost_risk,
-            'delay_risk': delay_risk,
-            'overall_risk': round(overall_risk, 1)
-        }
+    fig.clear()
+    fig.set_size_inches(figsize)
+    return fig, fig.add_subplot()
+
+def _render_png(fig):
+    """Lay out the figure and render it straight to a PNG buffer"""
+    fig.tight_layout()
+    img_buffer = io.BytesIO()
+    fig.canvas.print_png(img_buffer)
+    img_buffer.seek(0)
+    return img_buffer
+
+# Fixed chart labels, colours and layout
+_RISK_PIE_LABELS = ('Coverage Risk', 'Out-of-Pocket Risk', 'Delay Risk')
+_RISK_PIE_COLORS = ('#FF6B6B', '#4ECDC4', '#45B7D1')
+_IMPACT_COLORS = {
+    'Critical': '#FF0000',
+    'High': '#FF6B6B',
+    'Medium-High': '#FFA500',
+    'Medium': '#FFD93D',
+    'Low': '#6BCB77'
+}
+_COMPARISON_CATEGORIES = ('Coverage', 'Out-of-Pocket', 'Delay')
+_INDUSTRY_AVG = (45, 35, 25)  # Industry averages
+_BAR_WIDTH = 0.35
+_COMPARISON_X = tuple(range(len(_COMPARISON_CATEGORIES)))
+_POLICY_BAR_X = tuple(i - _BAR_WIDTH/2 for i in _COMPARISON_X)
+_INDUSTRY_BAR_X = tuple(i + _BAR_WIDTH/2 for i in _COMPARISON_X)
+_CLAIM_PIE_LABELS = ('Insurance Pays', 'You Pay')
+_CLAIM_PIE_COLORS = ('#28a745', '#dc3545')
 
 class VisualizationGenerator:
     """Generate professional visualizations for policy analysis"""
@@ -1073,27 +641,19 @@ class VisualizationGenerator:
     @staticmethod
     def create_risk_pie_chart(ml_risks):
         """Create a pie chart showing ML-based risk distribution"""
-        fig, ax = plt.subplots(figsize=(8, 6))
+        fig, ax = _chart_axes((8, 6))
         
-        labels = ['Coverage Risk', 'Out-of-Pocket Risk', 'Delay Risk']
         values = [
             ml_risks.get('coverage_risk', 0),
             ml_risks.get('cost_risk', 0),
             ml_risks.get('delay_risk', 0)
         ]
-        colors_list = ['#FF6B6B', '#4ECDC4', '#45B7D1']
         
-        wedges, texts, autotexts = ax.pie(values, labels=labels, autopct='%1.1f%%',
-                                          colors=colors_list, startangle=90)
+        wedges, texts, autotexts = ax.pie(values, labels=_RISK_PIE_LABELS, autopct='%1.1f%%',
+                                          colors=_RISK_PIE_COLORS, startangle=90)
         ax.set_title('Claim Risk Breakdown', fontsize=16, fontweight='bold')
         
-        # Save to bytes buffer
-        img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format='png', dpi=100, bbox_inches='tight')
-        img_buffer.seek(0)
-        plt.close()
-        
-        return img_buffer
+        return _render_png(fig)
     
     @staticmethod
     def create_risk_breakdown_pie_chart(risk_factors):
@@ -1102,26 +662,16 @@ class VisualizationGenerator:
             return None
         
         # Count risks by impact level
-        impact_counts = defaultdict(int)
-        for risk in risk_factors:
-            impact_counts[risk['impact']] += 1
+        impact_counts = Counter(risk['impact'] for risk in risk_factors)
         
         # Prepare data
         labels = list(impact_counts.keys())
         sizes = list(impact_counts.values())
         
-        # Color mapping for different impact levels
-        color_map = {
-            'Critical': '#FF0000',
-            'High': '#FF6B6B',
-            'Medium-High': '#FFA500',
-            'Medium': '#FFD93D',
-            'Low': '#6BCB77'
-        }
-        colors_list = [color_map.get(impact, '#808080') for impact in labels]
+        colors_list = [_IMPACT_COLORS.get(impact, '#808080') for impact in labels]
         
         # Create pie chart
-        fig, ax = plt.subplots(figsize=(8, 8))
+        fig, ax = _chart_axes((8, 8))
         wedges, texts, autotexts = ax.pie(sizes, labels=labels, colors=colors_list,
                                           autopct='%1.1f%%', startangle=90, shadow=True)
         
@@ -1137,37 +687,26 @@ class VisualizationGenerator:
         ax.set_title('Risk Factor Breakdown by Impact', fontsize=16, fontweight='bold', pad=20)
         ax.axis('equal')
         
-        # Save to bytes buffer
-        img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format='png', dpi=100, bbox_inches='tight')
-        img_buffer.seek(0)
-        plt.close()
-        
-        return img_buffer
+        return _render_png(fig)
     
     @staticmethod
     def create_comparison_bar_chart(ml_risks):
         """Create a bar chart comparing policy vs industry average"""
-        fig, ax = plt.subplots(figsize=(10, 6))
+        fig, ax = _chart_axes((10, 6))
         
-        categories = ['Coverage', 'Out-of-Pocket', 'Delay']
         policy_values = [
             ml_risks.get('coverage_risk', 0),
             ml_risks.get('cost_risk', 0),
             ml_risks.get('delay_risk', 0)
         ]
-        industry_avg = [45, 35, 25]  # Industry averages
-        
-        x = np.arange(len(categories))
-        width = 0.35
         
-        bars1 = ax.bar(x - width/2, policy_values, width, label='This Policy', color='#FF6B6B')
-        bars2 = ax.bar(x + width/2, industry_avg, width, label='Industry Avg', color='#45B7D1', alpha=0.7)
+        bars1 = ax.bar(_POLICY_BAR_X, policy_values, _BAR_WIDTH, label='This Policy', color='#FF6B6B')
+        bars2 = ax.bar(_INDUSTRY_BAR_X, _INDUSTRY_AVG, _BAR_WIDTH, label='Industry Avg', color='#45B7D1', alpha=0.7)
         
         ax.set_ylabel('Risk Score (%)')
         ax.set_title('Policy vs Industry Average Comparison')
-        ax.set_xticks(x)
-        ax.set_xticklabels(categories)
+        ax.set_xticks(_COMPARISON_X)
+        ax.set_xticklabels(_COMPARISON_CATEGORIES)
         ax.legend()
         ax.set_ylim(0, 100)
         
@@ -1177,32 +716,75 @@ class VisualizationGenerator:
             ax.text(bar.get_x() + bar.get_width()/2., height,
                    f'{int(height)}%', ha='center', va='bottom')
         
-        img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format='png', dpi=100, bbox_inches='tight')
-        img_buffer.seek(0)
-        plt.close()
-        
-        return img_buffer
+        return _render_png(fig)
     
     @staticmethod
     def create_claim_impact_chart(claim_amount, insurance_pays, out_of_pocket):
         """Create a pie chart showing claim impact distribution"""
-        fig, ax = plt.subplots(figsize=(8, 8))
+        fig, ax = _chart_axes((8, 8))
         
-        labels = ['Insurance Pays', 'You Pay']
         values = [insurance_pays, out_of_pocket]
-        colors_list = ['#28a745', '#dc3545']
         
-        wedges, texts, autotexts = ax.pie(values, labels=labels, autopct='%1.1f%%',
-                                          colors=colors_list, startangle=90, explode=(0.05, 0.05))
+        wedges, texts, autotexts = ax.pie(values, labels=_CLAIM_PIE_LABELS, autopct='%1.1f%%',
+                                          colors=_CLAIM_PIE_COLORS, startangle=90, explode=(0.05, 0.05))
         ax.set_title(f'Claim Impact Analysis - Total: ₹{claim_amount:,.0f}', fontsize=14, fontweight='bold')
         
-        img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format='png', dpi=100, bbox_inches='tight')
-        img_buffer.seek(0)
-        plt.close()
-        
-        return img_buffer
+        return _render_png(fig)
+
+# Analysis charts, rendered in the background and served by /api/chart
+CHART_RENDERERS = {
+    'risk_pie': lambda policy: VisualizationGenerator.create_risk_pie_chart(policy['risk_scores']),
+    'risk_breakdown': lambda policy: VisualizationGenerator.create_risk_breakdown_pie_chart(policy['risks']),
+    'comparison_chart': lambda policy: VisualizationGenerator.create_comparison_bar_chart(policy['risk_scores'])
+}
+
+_chart_cache = OrderedDict()
+_chart_cache_lock = threading.Lock()
+
+def _cache_chart(key, job):
+    """Remember a chart render job, evicting the oldest beyond CHART_CACHE_SIZE"""
+    with _chart_cache_lock:
+        _chart_cache[key] = job
+        while len(_chart_cache) > app.config['CHART_CACHE_SIZE']:
+            _chart_cache.popitem(last=False)
+
+def queue_policy_charts(policy, user_id):
+    """Start rendering a policy's charts and return their URLs"""
+    chart_urls = {}
+    for name, render in CHART_RENDERERS.items():
+        if name == 'risk_breakdown' and not policy['risks']:
+            continue  # Nothing to break down
+        _cache_chart((user_id, policy['id'], name), chart_pool.submit(render, policy))
+        chart_urls[name] = url_for('get_chart', policy_id=policy['id'], name=name)
+    return chart_urls
+
+def get_policy_chart(policy_id, name, user_id):
+    """Get a chart's PNG bytes, re-rendering from the database if it isn't cached"""
+    if name not in CHART_RENDERERS:
+        return None
+    
+    key = (user_id, policy_id, name)
+    with _chart_cache_lock:
+        job = _chart_cache.get(key)
+        if job is not None:
+            _chart_cache.move_to_end(key)
+    
+    if job is None:
+        policy = get_policy_by_id(policy_id, user_id)
+        if not policy:
+            return None
+        job = chart_pool.submit(CHART_RENDERERS[name], policy)
+        _cache_chart(key, job)
+    
+    try:
+        chart = job.result()
+    except Exception:
+        # Forget the failed render so the next request draws it again
+        with _chart_cache_lock:
+            if _chart_cache.get(key) is job:
+                del _chart_cache[key]
+        raise
+    return chart.getvalue() if chart else None
 
 # Error Handlers
 @app.errorhandler(404)
@@ -1289,18 +871,16 @@ def analyze_policy():
         disease = request.form.get('disease', '')
         selected_type = request.form.get('policyType', 'Health Insurance')
         
-        # Read PDF
+        # Read the upload once; the same bytes are analyzed and written to disk
+        pdf_bytes = file.read()
+        
+        # Read and analyze PDF
         try:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ''
-            for page in pdf_reader.pages:
-                extracted = page.extract_text()
-                if extracted:
-                    text += extracted + ' '
+            page_count, analysis = get_pdf_analysis(pdf_bytes)
         except Exception as e:
             return jsonify({'error': 'Could not read PDF file. Please ensure it is a valid PDF.'}), 400
         
-        if not text.strip():
+        if analysis is None:
             return jsonify({'error': 'Could not extract text from PDF. The file might be scanned or image-based.'}), 400
         
         # Save uploaded file
@@ -1308,37 +888,22 @@ def analyze_policy():
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         saved_filename = f"{timestamp}_{filename}"
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], saved_filename)
-        file.seek(0)  # Reset file pointer
-        file.save(file_path)
-        
-        # Detect policy type from PDF content
-        text_lower = text.lower()
-        type_keywords = {
-            "Health Insurance": ['health', 'medical', 'hospital', 'surgery', 'disease', 'treatment', 'doctor', 'medicine', 'illness', 'diagnosis'],
-            "Car Insurance": ['car', 'vehicle', 'motor', 'automobile', 'accident', 'drive', 'driver', 'collision', 'theft', 'damage'],
-            "Life Insurance": ['life', 'death', 'term', 'maturity', 'nominee', 'assured', 'survival', 'beneficiary'],
-            "Travel Insurance": ['travel', 'trip', 'flight', 'baggage', 'overseas', 'foreign', 'passport', 'visa', 'journey']
-        }
-        
-        type_scores = {}
-        for p_type, keywords in type_keywords.items():
-            score = sum(text_lower.count(word) for word in keywords)
-            type_scores[p_type] = score
-        
-        detected_type = max(type_scores, key=type_scores.get) if max(type_scores.values()) > 0 else "Unknown"
+        with open(file_path, 'wb') as f:
+            f.write(pdf_bytes)
         
-        # Extract key clauses
-        clauses = PolicyAnalyzer.extract_key_clauses(text)
+        # Text-only analysis results
+        detected_type = analysis['detected_type']
+        clauses = analysis['clauses']
         
         # ============= MODIFIED SECTION: AI + REGEX EXTRACTION =============
         # Extract financial details using AI first, then fallback to RiskPredictor
-        ai_extracted = ai_extract_policy_details(text)
+        ai_extracted = analysis['ai_extracted']
         
         # Initialize with regex defaults
-        co_pay_percentage = RiskPredictor.extract_co_pay_percentage(text)
-        deductible = RiskPredictor.extract_deductible(text)
-        room_rent_cap = RiskPredictor.extract_room_rent_cap(text)
-        sub_limits = RiskPredictor.extract_sub_limits(text)
+        co_pay_percentage = analysis['co_pay_percentage']
+        deductible = analysis['deductible']
+        room_rent_cap = analysis['room_rent_cap']
+        sub_limits = analysis['sub_limits']
         
         # Override with AI values if available and valid
         if ai_extracted:
@@ -1356,41 +921,44 @@ def analyze_policy():
             
             # Note: AI exclusions and covered_diseases are extracted but
             # your existing exclusions extraction continues to work
-            print(f"AI extracted: {ai_extracted}")  # For debugging
         # ===================================================================
         
         # Use ML to predict risk scores
-        ml_risks = RiskPredictor.predict_risk(text, selected_type, age, bool(disease))
+        ml_risks = RiskPredictor.score_features(analysis['features'], selected_type, age, bool(disease))
         
         # Extract all policy details
-        policy_number = re.search(r'policy\s*(?:no|number)[:\s]*([A-Z0-9/-]+)', text, re.I)
-        policy_number = policy_number.group(1) if policy_number else "Not found"
-        
-        sum_insured = PolicyAnalyzer.extract_sum_insured(text)
-        premium = PolicyAnalyzer.extract_premium(text)
-        key_dates = PolicyAnalyzer.extract_key_dates(text)
-        benefits = PolicyAnalyzer.extract_benefits(text)
-        exclusions = PolicyAnalyzer.extract_exclusions(text)
+        policy_number = analysis['policy_number']
+        sum_insured = analysis['sum_insured']
+        premium = analysis['premium']
+        key_dates = analysis['key_dates']
+        benefits = analysis['benefits']
+        exclusions = analysis['exclusions']
         
         # Coverage details
         coverage = {
-            'comprehensive': "Yes" if "comprehensive" in text.lower() else "Limited/Specified",
-            'waiting_period': PolicyAnalyzer.extract_waiting_period(text),
+            'comprehensive': analysis['comprehensive'],
+            'waiting_period': analysis['waiting_period'],
             'co_pay': f"{co_pay_percentage}%" if co_pay_percentage > 0 else "0%",
             'deductible': f"₹{deductible:,}" if deductible > 0 else "Not specified"
         }
         
         # Analyze risk factors
-        risk_factors = PolicyAnalyzer.analyze_risk_factors(text, age, disease)
+        risk_factors = PolicyAnalyzer.analyze_risk_factors(
+            age, disease,
+            copay=co_pay_percentage,
+            deductible=deductible,
+            waiting_period=coverage['waiting_period'],
+            exclusion_count=analysis['exclusion_count']
+        )
         
         # Calculate risk scores using ML
         risk_scores = PolicyAnalyzer.calculate_risk_score(age, disease, risk_factors, coverage, ml_risks)
         
         # Analyze quality metrics
-        quality_metrics = PolicyAnalyzer.analyze_policy_quality(text)
+        quality_metrics = analysis['quality_metrics']
         
         # Generate unique ID
-        policy_id = hashlib.md5(f"{text}{datetime.now()}".encode()).hexdigest()[:16]
+        policy_id = secrets.token_hex(8)
         
         # Prepare comprehensive result
         result = {
@@ -1416,40 +984,25 @@ def analyze_policy():
                 'room_rent_cap': room_rent_cap,
                 'sub_limits': sub_limits
             },
-            'text_length': len(text),
-            'page_count': len(pdf_reader.pages),
+            'text_length': analysis['text_length'],
+            'page_count': page_count,
             'unique_id': policy_id
         }
         
+        # Start rendering visualizations; the client fetches them from the chart URLs
+        chart_urls = queue_policy_charts(result, session['user']['id'])
+        
         # Save to database
         save_policy_to_db(session['user']['id'], result, file_path)
         
-        # Generate visualizations
-        visualizations = {}
-        
-        # Risk pie chart
-        risk_chart = VisualizationGenerator.create_risk_pie_chart(risk_scores)
-        if risk_chart:
-            visualizations['risk_pie'] = base64.b64encode(risk_chart.getvalue()).decode('utf-8')
-        
-        # Risk breakdown pie chart
-        risk_breakdown_chart = VisualizationGenerator.create_risk_breakdown_pie_chart(risk_factors)
-        if risk_breakdown_chart:
-            visualizations['risk_breakdown'] = base64.b64encode(risk_breakdown_chart.getvalue()).decode('utf-8')
-        
-        # Comparison bar chart
-        comparison_chart = VisualizationGenerator.create_comparison_bar_chart(risk_scores)
-        if comparison_chart:
-            visualizations['comparison_chart'] = base64.b64encode(comparison_chart.getvalue()).decode('utf-8')
-        
         return jsonify({
             'success': True,
             'policy': result,
-            'visualizations': visualizations
+            'chart_urls': chart_urls
         })
         
     except Exception as e:
-        print(f"Analysis Error: {str(e)}")
+        logger.exception("Analysis error")
         return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
 
 @app.route('/api/simulate-claim', methods=['POST'])
@@ -1509,7 +1062,7 @@ def simulate_claim():
         })
         
     except Exception as e:
-        print(f"Simulation Error: {str(e)}")
+        logger.exception("Simulation error")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/compare-policies', methods=['POST'])
@@ -1524,25 +1077,17 @@ def compare_policies():
             return jsonify({'error': 'At least 2 policies required for comparison'}), 400
         
         # Get selected policies for this user
-        selected_policies = []
-        for policy_id in policy_ids:
-            policy = get_policy_by_id(policy_id, session['user']['id'])
-            if policy:
-                selected_policies.append(policy)
+        selected_policies = get_policies_by_ids(policy_ids, session['user']['id'])
         
         if len(selected_policies) < 2:
             return jsonify({'error': 'Selected policies not found'}), 404
         
+        summary = get_policy_risk_summary(policy_ids, session['user']['id'])
+        
         # Prepare comparison data
         comparison = {
             'policies': selected_policies,
-            'metrics': {
-                'avg_coverage_risk': sum(p['risk_scores']['coverage_risk'] for p in selected_policies) / len(selected_policies),
-                'avg_cost_risk': sum(p['risk_scores']['cost_risk'] for p in selected_policies) / len(selected_policies),
-                'avg_delay_risk': sum(p['risk_scores']['delay_risk'] for p in selected_policies) / len(selected_policies),
-                'min_overall': min(p['risk_scores']['overall_risk'] for p in selected_policies),
-                'max_overall': max(p['risk_scores']['overall_risk'] for p in selected_policies)
-            },
+            'metrics': dict(summary),
             'recommendation': None
         }
         
@@ -1559,292 +1104,429 @@ def compare_policies():
         })
         
     except Exception as e:
-        print(f"Comparison Error: {str(e)}")
+        logger.exception("Comparison error")
         return jsonify({'error': str(e)}), 500
 
+# Dashboard risk buckets, indexed by the bucket number get_user_policy_stats computes
+_RISK_BUCKET_LABELS = ('Low (0-30)', 'Moderate (31-60)', 'High (61-80)', 'Critical (81-100)')
+
 @app.route('/api/policy-stats')
 @login_required
 def policy_stats():
     """Get policy statistics for dashboard"""
     try:
-        # Get user's policies
-        policies = get_user_policies(session['user']['id'], limit=100)
+        # Aggregate user's policies in the database
+        groups, recent = get_user_policy_stats(session['user']['id'], limit=100)
+        
+        # Fold the grouped rows in a single pass
+        total_analyzed = 0
+        total_risk = 0
+        type_counts = Counter()
+        risk_distribution = dict.fromkeys(_RISK_BUCKET_LABELS, 0)
+        for row in groups:
+            total_analyzed += row['policy_count']
+            total_risk += row['total_risk']
+            type_counts[row['policy_type']] += row['policy_count']
+            risk_distribution[_RISK_BUCKET_LABELS[row['bucket']]] += row['policy_count']
         
         stats = {
-            'total_analyzed': len(policies),
-            'avg_risk_score': 0,
-            'policy_types': {},
-            'risk_distribution': {
-                'Low (0-30)': 0,
-                'Moderate (31-60)': 0,
-                'High (61-80)': 0,
-                'Critical (81-100)': 0
-            },
-            'recent_activity': []
+            'total_analyzed': total_analyzed,
+            'avg_risk_score': round(total_risk / total_analyzed, 1) if total_analyzed else 0,
+            'policy_types': dict(type_counts),
+            'risk_distribution': risk_distribution,
+            'recent_activity': [
+                {
+                    'id': row['id'],
+                    'type': row['policy_type'],
+                    'risk': row['overall_risk'],
+                    'time': row['upload_time']
+                }
+                for row in recent
+            ]
         }
         
-        if policies:
-            # Average risk score
-            stats['avg_risk_score'] = round(sum(p['risk_scores']['overall_risk'] for p in policies) / len(policies), 1)
-            
-            # Policy type distribution
-            type_counts = defaultdict(int)
-            for policy in policies:
-                type_counts[policy['policy_type']] += 1
-            stats['policy_types'] = dict(type_counts)
-            
-            # Risk distribution
-            for policy in policies:
-                risk = policy['risk_scores']['overall_risk']
-                if risk <= 30:
-                    stats['risk_distribution']['Low (0-30)'] += 1
-                elif risk <= 60:
-                    stats['risk_distribution']['Moderate (31-60)'] += 1
-                elif risk <= 80:
-                    stats['risk_distribution']['High (61-80)'] += 1
-                else:
-                    stats['risk_distribution']['Critical (81-100)'] += 1
-            
-            # Recent activity
-            for policy in policies[:5]:
-                stats['recent_activity'].append({
-                    'id': policy['id'],
-                    'type': policy['policy_type'],
-                    'risk': policy['risk_scores']['overall_risk'],
-                    'time': policy['upload_time']
-                })
-        
         return jsonify(stats)
         
     except Exception as e:
-        print(f"Stats Error: {str(e)}")
+        logger.exception("Stats error")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/generate-report/<policy_id>')
-@login_required
-def generate_report(policy_id):
-    """Enhanced PDF report generation with charts"""
-    try:
-        # Find policy for this user
-        policy = get_policy_by_id(policy_id, session['user']['id'])
-        if not policy:
-            return jsonify({'error': 'Policy not found'}), 404
-        
-        # Create PDF with ReportLab
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Custom styles
-        title_style = ParagraphStyle(
+# A plain amount such as "5,00,000" or "12500.50"; group 1 is the whole-rupee part
+_PLAIN_AMOUNT_RE = re.compile(r'(?=[\d,.]*\d)([\d,]*)(?:\.[\d,]*)?')
+
+@lru_cache(maxsize=1024)
+def _fmt_rupees(value):
+    """Format a stored plain amount as whole rupees, leaving any other text as is"""
+    match = _PLAIN_AMOUNT_RE.fullmatch(value)
+    if not match:
+        return value
+    return f"₹{int(match.group(1).replace(',', '') or 0):,}"
+
+def _risk_level(score):
+    """Label a single risk score for the report's risk table"""
+    return 'High' if score > 60 else 'Medium' if score > 30 else 'Low'
+
+def _recommendation_pairs(policy, overall_risk):
+    """(applies, message) pairs for the report's recommendations section"""
+    financial = policy['financial_details']
+    return (
+        (overall_risk > 60,
+         "• High risk policy - consider reviewing with an insurance advisor"),
+        (financial['co_pay_percentage'] > 20,
+         f"• High co-pay ({financial['co_pay_percentage']}%) will significantly reduce claim payouts"),
+        (financial['deductible'] > 50000,
+         f"• High deductible of ₹{financial['deductible']:,} requires substantial out-of-pocket payment"),
+        (bool(policy['exclusions']),
+         "• Review all exclusions carefully to understand coverage gaps"),
+        (bool(policy.get('benefits')),
+         f"• Key benefits identified: {len(policy.get('benefits') or [])} areas of coverage"),
+    )
+
+@lru_cache(maxsize=1)
+def _report_styles():
+    """Build the paragraph and table styles shared by every PDF report"""
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    
+    styles = getSampleStyleSheet()
+    brand_navy = colors.HexColor('#0a1e32')
+    return {
+        'normal': styles['Normal'],
+        'italic': styles['Italic'],
+        'title': ParagraphStyle(
             'CustomTitle',
             parent=styles['Heading1'],
             fontSize=24,
-            textColor=colors.HexColor('#0a1e32'),
+            textColor=brand_navy,
             alignment=1,
             spaceAfter=30
-        )
-        
-        heading_style = ParagraphStyle(
+        ),
+        'heading': ParagraphStyle(
             'CustomHeading',
             parent=styles['Heading2'],
             fontSize=16,
-            textColor=colors.HexColor('#0a1e32'),
+            textColor=brand_navy,
             spaceAfter=12,
             spaceBefore=20
-        )
-        
-        # Title
-        story.append(Paragraph("ClaimGuard Professional Policy Analysis Report", title_style))
-        story.append(Spacer(1, 20))
-        
-        # Executive Summary
-        story.append(Paragraph("Executive Summary", heading_style))
-        
-        overall_risk = policy['risk_scores']['overall_risk']
-        risk_level = "LOW" if overall_risk <= 30 else "MODERATE" if overall_risk <= 60 else "HIGH" if overall_risk <= 80 else "CRITICAL"
-        
-        summary_text = f"""
-        This report provides a comprehensive analysis of the {policy['policy_type']} policy document.
-        Overall Risk Score: {overall_risk}% - {risk_level} Risk
-        Policy Validity: {policy.get('key_dates', {}).get('issue_date', 'Not specified')} to {policy.get('key_dates', {}).get('expiry_date', 'Not specified')}
-        """
-        story.append(Paragraph(summary_text, styles['Normal']))
-        story.append(Spacer(1, 20))
-        
-        # Policy Information
-        story.append(Paragraph("Policy Information", heading_style))
-        
-        # Format sum insured for display
-        sum_insured_display = policy['sum_insured']
-        if policy['sum_insured'] != 'Not specified' and policy['sum_insured'].replace(',', '').replace('.', '').isdigit():
-            try:
-                sum_insured_display = f"₹{int(float(policy['sum_insured'].replace(',', ''))):,}"
-            except:
-                pass
-        
-        # Format premium for display
-        premium_display = policy['premium']
-        if policy['premium'] != 'Not specified' and policy['premium'].replace(',', '').replace('.', '').isdigit():
-            try:
-                premium_display = f"₹{int(float(policy['premium'].replace(',', ''))):,}"
-            except:
-                pass
-        
-        info_data = [
-            ['Policy ID:', policy['id']],
-            ['File:', policy['filename'][:50] + '...' if len(policy['filename']) > 50 else policy['filename']],
-            ['Upload Date:', policy['upload_time']],
-            ['Policy Type:', policy['policy_type']],
-            ['Detected Type:', policy.get('detected_type', 'N/A')],
-            ['Policy Number:', policy['policy_number']],
-            ['Sum Insured:', sum_insured_display],
-            ['Premium:', premium_display],
-            ['Pages:', str(policy.get('page_count', 'N/A'))]
-        ]
-        
-        info_table = Table(info_data, colWidths=[2*inch, 4*inch])
-        info_table.setStyle(TableStyle([
+        ),
+        'info_table': TableStyle([
             ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
             ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#0a1e32')),
+            ('TEXTCOLOR', (0, 0), (0, -1), brand_navy),
             ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
             ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        story.append(info_table)
-        story.append(Spacer(1, 20))
-        
-        # Risk Analysis
-        story.append(Paragraph("Risk Analysis", heading_style))
-        
-        risk_scores = policy['risk_scores']
-        
-        # Risk scores table
-        risk_data = [
-            ['Risk Type', 'Score', 'Level'],
-            ['Claim Coverage Risk', f"{risk_scores['coverage_risk']}%", 
-             'High' if risk_scores['coverage_risk'] > 60 else 'Medium' if risk_scores['coverage_risk'] > 30 else 'Low'],
-            ['Out-of-Pocket Risk', f"{risk_scores['cost_risk']}%",
-             'High' if risk_scores['cost_risk'] > 60 else 'Medium' if risk_scores['cost_risk'] > 30 else 'Low'],
-            ['Claim Delay Risk', f"{risk_scores['delay_risk']}%",
-             'High' if risk_scores['delay_risk'] > 60 else 'Medium' if risk_scores['delay_risk'] > 30 else 'Low'],
-            ['Overall Risk', f"{risk_scores['overall_risk']}%", risk_level]
-        ]
-        
-        risk_table = Table(risk_data, colWidths=[2*inch, 1.5*inch, 1.5*inch])
-        risk_table.setStyle(TableStyle([
+        ]),
+        'risk_table': TableStyle([
             ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
             ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0a1e32')),
+            ('BACKGROUND', (0, 0), (-1, 0), brand_navy),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
             ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
             ('GRID', (0, 0), (-1, -1), 1, colors.grey),
             ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        story.append(risk_table)
-        story.append(Spacer(1, 20))
-        
-        # Financial Details
-        story.append(Paragraph("Financial Details", heading_style))
-        
-        financial = policy['financial_details']
-        financial_data = [
-            ['Co-pay Percentage:', f"{financial['co_pay_percentage']}%"],
-            ['Deductible:', f"₹{financial['deductible']:,}" if financial['deductible'] > 0 else 'Not specified'],
-            ['Room Rent Cap:', str(financial['room_rent_cap']) if financial['room_rent_cap'] else 'Not specified']
-        ]
-        
-        if financial['sub_limits']:
-            for limit_type, amount in financial['sub_limits'].items():
-                financial_data.append([f"{limit_type.title()} Sub-limit:", f"₹{amount:,}"])
-        
-        financial_table = Table(financial_data, colWidths=[2.5*inch, 3.5*inch])
-        financial_table.setStyle(TableStyle([
+        ]),
+        'financial_table': TableStyle([
             ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
             ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#0a1e32')),
+            ('TEXTCOLOR', (0, 0), (0, -1), brand_navy),
             ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
             ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        story.append(financial_table)
-        story.append(Spacer(1, 20))
-        
-        # Key Benefits
-        if policy.get('benefits'):
-            story.append(Paragraph("Key Benefits", heading_style))
-            for i, benefit in enumerate(policy['benefits'][:5], 1):
-                story.append(Paragraph(f"{i}. {benefit['text']}", styles['Normal']))
-                story.append(Spacer(1, 4))
-            story.append(Spacer(1, 10))
-        
-        # Exclusions
-        if policy['exclusions']:
-            story.append(Paragraph("Important Exclusions", heading_style))
-            for i, exclusion in enumerate(policy['exclusions'][:5], 1):
-                story.append(Paragraph(f"{i}. {exclusion}", styles['Normal']))
-                story.append(Spacer(1, 4))
-            story.append(Spacer(1, 10))
-        
-        # Key Clauses
-        if policy.get('clauses'):
-            story.append(Paragraph("Key Policy Clauses", heading_style))
-            for term, clause in list(policy['clauses'].items())[:5]:
-                if clause != "Not mentioned in document":
-                    story.append(Paragraph(f"<b>{term.title()}:</b> {clause[:150]}...", styles['Normal']))
-                    story.append(Spacer(1, 4))
-            story.append(Spacer(1, 10))
-        
-        # Recommendations
-        story.append(Paragraph("Recommendations", heading_style))
-        
-        recommendations = []
-        
-        if overall_risk > 60:
-            recommendations.append("• High risk policy - consider reviewing with an insurance advisor")
-        if financial['co_pay_percentage'] > 20:
-            recommendations.append(f"• High co-pay ({financial['co_pay_percentage']}%) will significantly reduce claim payouts")
-        if financial['deductible'] > 50000:
-            recommendations.append(f"• High deductible of ₹{financial['deductible']:,} requires substantial out-of-pocket payment")
-        if policy['exclusions']:
-            recommendations.append("• Review all exclusions carefully to understand coverage gaps")
-        if policy.get('benefits'):
-            recommendations.append(f"• Key benefits identified: {len(policy['benefits'])} areas of coverage")
-        
-        if not recommendations:
-            recommendations.append("• No specific recommendations - policy appears standard")
-        
-        for rec in recommendations:
-            story.append(Paragraph(rec, styles['Normal']))
+        ]),
+    }
+
+def build_policy_report(policy, output):
+    """Write the PDF analysis report for a policy to a path or binary file"""
+    # Create PDF with ReportLab (imported here so workers that never build reports don't load it)
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+    from reportlab.lib.units import inch
+    
+    doc = SimpleDocTemplate(output, pagesize=A4)
+    styles = _report_styles()
+    title_style = styles['title']
+    heading_style = styles['heading']
+    story = []
+    
+    # Title
+    story.append(Paragraph("ClaimGuard Professional Policy Analysis Report", title_style))
+    story.append(Spacer(1, 20))
+    
+    # Executive Summary
+    story.append(Paragraph("Executive Summary", heading_style))
+    
+    overall_risk = policy['risk_scores']['overall_risk']
+    risk_level = "LOW" if overall_risk <= 30 else "MODERATE" if overall_risk <= 60 else "HIGH" if overall_risk <= 80 else "CRITICAL"
+    
+    summary_text = f"""
+    This report provides a comprehensive analysis of the {policy['policy_type']} policy document.
+    Overall Risk Score: {overall_risk}% - {risk_level} Risk
+    Policy Validity: {policy.get('key_dates', {}).get('issue_date', 'Not specified')} to {policy.get('key_dates', {}).get('expiry_date', 'Not specified')}
+    """
+    story.append(Paragraph(summary_text, styles['normal']))
+    story.append(Spacer(1, 20))
+    
+    # Policy Information
+    story.append(Paragraph("Policy Information", heading_style))
+    
+    # Format sum insured and premium for display
+    sum_insured_display = _fmt_rupees(policy['sum_insured'])
+    premium_display = _fmt_rupees(policy['premium'])
+    
+    info_data = [
+        ['Policy ID:', policy['id']],
+        ['File:', policy['filename'][:50] + '...' if len(policy['filename']) > 50 else policy['filename']],
+        ['Upload Date:', policy['upload_time']],
+        ['Policy Type:', policy['policy_type']],
+        ['Detected Type:', policy.get('detected_type', 'N/A')],
+        ['Policy Number:', policy['policy_number']],
+        ['Sum Insured:', sum_insured_display],
+        ['Premium:', premium_display],
+        ['Pages:', str(policy.get('page_count', 'N/A'))]
+    ]
+    
+    info_table = Table(info_data, colWidths=[2*inch, 4*inch], style=styles['info_table'])
+    story.append(info_table)
+    story.append(Spacer(1, 20))
+    
+    # Risk Analysis
+    story.append(Paragraph("Risk Analysis", heading_style))
+    
+    risk_scores = policy['risk_scores']
+    
+    # Risk scores table
+    risk_data = [
+        ['Risk Type', 'Score', 'Level'],
+        ['Claim Coverage Risk', f"{risk_scores['coverage_risk']}%", _risk_level(risk_scores['coverage_risk'])],
+        ['Out-of-Pocket Risk', f"{risk_scores['cost_risk']}%", _risk_level(risk_scores['cost_risk'])],
+        ['Claim Delay Risk', f"{risk_scores['delay_risk']}%", _risk_level(risk_scores['delay_risk'])],
+        ['Overall Risk', f"{risk_scores['overall_risk']}%", risk_level]
+    ]
+    
+    risk_table = Table(risk_data, colWidths=[2*inch, 1.5*inch, 1.5*inch], style=styles['risk_table'])
+    story.append(risk_table)
+    story.append(Spacer(1, 20))
+    
+    # Financial Details
+    story.append(Paragraph("Financial Details", heading_style))
+    
+    financial = policy['financial_details']
+    financial_data = [
+        ['Co-pay Percentage:', f"{financial['co_pay_percentage']}%"],
+        ['Deductible:', f"₹{financial['deductible']:,}" if financial['deductible'] > 0 else 'Not specified'],
+        ['Room Rent Cap:', str(financial['room_rent_cap']) if financial['room_rent_cap'] else 'Not specified']
+    ]
+    
+    if financial['sub_limits']:
+        for limit_type, amount in financial['sub_limits'].items():
+            financial_data.append([f"{limit_type.title()} Sub-limit:", f"₹{amount:,}"])
+    
+    financial_table = Table(financial_data, colWidths=[2.5*inch, 3.5*inch], style=styles['financial_table'])
+    story.append(financial_table)
+    story.append(Spacer(1, 20))
+    
+    # Key Benefits
+    if policy.get('benefits'):
+        story.append(Paragraph("Key Benefits", heading_style))
+        for i, benefit in enumerate(policy['benefits'][:5], 1):
+            story.append(Paragraph(f"{i}. {benefit['text']}", styles['normal']))
             story.append(Spacer(1, 4))
+        story.append(Spacer(1, 10))
+    
+    # Exclusions
+    if policy['exclusions']:
+        story.append(Paragraph("Important Exclusions", heading_style))
+        for i, exclusion in enumerate(policy['exclusions'][:5], 1):
+            story.append(Paragraph(f"{i}. {exclusion}", styles['normal']))
+            story.append(Spacer(1, 4))
+        story.append(Spacer(1, 10))
+    
+    # Key Clauses
+    if policy.get('clauses'):
+        story.append(Paragraph("Key Policy Clauses", heading_style))
+        # One paragraph for all clauses so its markup is parsed once
+        clause_lines = [
+            f"<b>{term.title()}:</b> {clause[:150]}..."
+            for term, clause in islice(policy['clauses'].items(), 5)
+            if clause != "Not mentioned in document"
+        ]
+        if clause_lines:
+            story.append(Paragraph('<br/>'.join(clause_lines), styles['normal']))
+            story.append(Spacer(1, 4))
+        story.append(Spacer(1, 10))
+    
+    # Recommendations
+    story.append(Paragraph("Recommendations", heading_style))
+    
+    recommendations = [
+        message for applies, message in _recommendation_pairs(policy, overall_risk) if applies
+    ] or ["• No specific recommendations - policy appears standard"]
+    
+    for rec in recommendations:
+        story.append(Paragraph(rec, styles['normal']))
+        story.append(Spacer(1, 4))
+    
+    # Footer
+    story.append(Spacer(1, 30))
+    footer_text = f"Report generated by ClaimGuard on {datetime.now().strftime('%Y-%m-%d %H:%M')} | Confidential | ID: {policy['id']}"
+    story.append(Paragraph(footer_text, styles['italic']))
+    
+    # Build PDF
+    doc.build(story)
+
+# PDF reports are built off the request thread and written to REPORT_FOLDER
+report_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='reports')
+_report_jobs = OrderedDict()
+_report_jobs_lock = threading.Lock()
+
+def _report_path(user_id, job_id):
+    """Location of a finished report on disk; the job's .pending/.error markers sit beside it"""
+    return os.path.join(app.config['REPORT_FOLDER'], str(user_id), f"{job_id}.pdf")
+
+def _write_report(policy, path):
+    """Build a report into a temporary file and move it into place once complete"""
+    partial_path = path + '.part'
+    try:
+        build_policy_report(policy, partial_path)
+        os.replace(partial_path, path)
+    except Exception:
+        logger.exception("PDF report error")
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        os.replace(path + '.pending', path + '.error')
+        raise
+    # Drop the marker only once the finished file is in place
+    os.remove(path + '.pending')
+
+def _remove_report(user_id, job_id):
+    """Delete a report file and its error marker if they are still on disk"""
+    path = _report_path(user_id, job_id)
+    for report_file in (path, path + '.error'):
+        try:
+            os.remove(report_file)
+        except FileNotFoundError:
+            pass
+
+def _discard_report(user_id, job_id):
+    """Delete a served report and stop tracking its job"""
+    _remove_report(user_id, job_id)
+    with _report_jobs_lock:
+        _report_jobs.pop(job_id, None)
+
+def _evict_report_jobs():
+    """Drop the oldest finished jobs beyond REPORT_JOB_LIMIT, along with their files"""
+    # Caller holds _report_jobs_lock; running jobs are never evicted
+    excess = len(_report_jobs) - app.config['REPORT_JOB_LIMIT']
+    if excess <= 0:
+        return
+    finished = list(islice((job_id for job_id, (_, job) in _report_jobs.items() if job.done()), excess))
+    for job_id in finished:
+        user_id, _ = _report_jobs.pop(job_id)
+        _remove_report(user_id, job_id)
+
+def queue_policy_report(policy, user_id):
+    """Start building a policy's report and return its job id"""
+    # The job id carries the policy id so downloads can be named after a restart
+    job_id = f"{policy['id']}-{secrets.token_hex(8)}"
+    path = _report_path(user_id, job_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    
+    # Status polls can land on any worker process, so the job's state is kept on disk
+    open(path + '.pending', 'wb').close()
+    job = report_pool.submit(_write_report, policy, path)
+    with _report_jobs_lock:
+        _report_jobs[job_id] = (user_id, job)
+        _evict_report_jobs()
+    return job_id
+
+def get_report_status(job_id, user_id):
+    """Get a report job's status from its files: 'pending', 'done', 'error' or None if unknown"""
+    if secure_filename(job_id) != job_id:
+        return None
+    path = _report_path(user_id, job_id)
+    
+    try:
+        pending_since = os.path.getmtime(path + '.pending')
+    except FileNotFoundError:
+        pass
+    else:
+        # A marker this old was left by a process that died mid-build
+        if time.time() - pending_since < app.config['REPORT_TIMEOUT']:
+            return 'pending'
+        return 'error'
+    
+    if os.path.exists(path):
+        return 'done'
+    if os.path.exists(path + '.error'):
+        return 'error'
+    return None
+
+@app.route('/api/generate-report/<policy_id>')
+@login_required
+def generate_report(policy_id):
+    """Queue PDF report generation and return where to poll for it"""
+    try:
+        # Find policy for this user
+        policy = get_policy_by_id(policy_id, session['user']['id'])
+        if not policy:
+            return jsonify({'error': 'Policy not found'}), 404
         
-        # Footer
-        story.append(Spacer(1, 30))
-        footer_text = f"Report generated by ClaimGuard on {datetime.now().strftime('%Y-%m-%d %H:%M')} | Confidential | ID: {policy['id']}"
-        story.append(Paragraph(footer_text, styles['Italic']))
-        
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f'ClaimGuard_Report_{policy_id}.pdf',
-            mimetype='application/pdf'
-        )
+        job_id = queue_policy_report(policy, session['user']['id'])
+        return jsonify({
+            'job_id': job_id,
+            'status_url': url_for('report_status', job_id=job_id),
+            'download_url': url_for('report_download', job_id=job_id)
+        }), 202
         
     except Exception as e:
-        print(f"PDF Error: {str(e)}")
+        logger.exception("PDF error")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/report-status/<job_id>')
+@login_required
+def report_status(job_id):
+    """Poll a queued PDF report"""
+    status = get_report_status(job_id, session['user']['id'])
+    if status is None:
+        return jsonify({'error': 'Report not found'}), 404
+    return jsonify({'job_id': job_id, 'status': status})
+
+@app.route('/api/report-download/<job_id>')
+@login_required
+def report_download(job_id):
+    """Download a finished PDF report"""
+    user_id = session['user']['id']
+    status = get_report_status(job_id, user_id)
+    if status is None:
+        return jsonify({'error': 'Report not found'}), 404
+    if status != 'done':
+        return jsonify({'error': 'Report is not ready', 'status': status}), 409
+    
+    try:
+        report_file = open(_report_path(user_id, job_id), 'rb')
+    except FileNotFoundError:
+        return jsonify({'error': 'Report not found'}), 404
+    
+    # Reports are single-use: unlink the file now, send_file streams the open handle and closes it
+    _discard_report(user_id, job_id)
+    
+    policy_id = job_id.rpartition('-')[0]
+    response = send_file(
+        report_file,
+        as_attachment=True,
+        download_name=f'ClaimGuard_Report_{policy_id}.pdf',
+        mimetype='application/pdf'
+    )
+    response.content_length = os.fstat(report_file.fileno()).st_size
+    return response
+
 @app.route('/api/recent-policies')
 @login_required
 def recent_policies():
     """Get recent analyzed policies for the current user"""
     try:
-        policies = get_user_policies(session['user']['id'], limit=10)
+        policies = get_user_policy_summaries(session['user']['id'], limit=10)
         return jsonify(policies)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1861,6 +1543,22 @@ def get_policy(policy_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/chart/<policy_id>/<name>')
+@login_required
+def get_chart(policy_id, name):
+    """Serve a rendered analysis chart for the current user's policy"""
+    try:
+        png = get_policy_chart(policy_id, name, session['user']['id'])
+        if png is None:
+            return jsonify({'error': 'Chart not found'}), 404
+        response = send_file(io.BytesIO(png), mimetype='image/png', max_age=3600)
+        response.cache_control.public = False
+        response.cache_control.private = True  # Per-user content
+        return response
+    except Exception as e:
+        logger.exception("Chart error")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/policy-types')
 @login_required
 def get_policy_types():
@@ -1874,15 +1572,16 @@ def get_policy_types():
 # Cleanup old files (optional - can be run as a scheduled task)
 @app.cli.command('cleanup')
 def cleanup_old_files():
-    """Clean up old uploaded files"""
+    """Clean up old uploaded files and generated reports"""
     import shutil
     from pathlib import Path
     
-    upload_dir = Path(app.config['UPLOAD_FOLDER'])
-    if upload_dir.exists():
-        shutil.rmtree(upload_dir)
-        upload_dir.mkdir()
-        print(f"Cleaned up {upload_dir}")
+    for folder in (app.config['UPLOAD_FOLDER'], app.config['REPORT_FOLDER']):
+        folder_dir = Path(folder)
+        if folder_dir.exists():
+            shutil.rmtree(folder_dir)
+            folder_dir.mkdir()
+            print(f"Cleaned up {folder_dir}")
 
 
 if __name__ == '__main__':
@@ -1,3 +1,798 @@
+import io
+import logging
+import re
+from collections import defaultdict, Counter
+from operator import itemgetter
+
+import ahocorasick
+import pypdfium2 as pdfium
+
+# Child of the app logger, so records reach its queue handler when loaded by main
+logger = logging.getLogger('claimguard.analysis')
+
+def extract_pdf_text(pdf_bytes):
+    """Extract text from a PDF, returns (text, page_count)"""
+    try:
+        pdf = pdfium.PdfDocument(pdf_bytes)
+        try:
+            pages = [page.get_textpage().get_text_range() for page in pdf]
+        finally:
+            pdf.close()
+        # PDFium reports line breaks as CRLF
+        return ' '.join(page_text.replace('\r\n', '\n') for page_text in pages if page_text), len(pages)
+    except Exception as e:
+        logger.warning("PDFium extraction error, falling back to PyPDF2: %s", e)
+    
+    # Fall back to PyPDF2 for files PDFium can't open
+    import PyPDF2
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    parts = []
+    for page in pdf_reader.pages:
+        extracted = page.extract_text()
+        if extracted:
+            parts.append(extracted)
+    return ' '.join(parts), len(pdf_reader.pages)
+
+# Precompiled regex patterns used by the extractors below. Policy text is untrusted, so
+# optional parts carry their own trailing whitespace rather than sitting between two
+# whitespace runs, and leading numbers only match from the start of a digit run; both
+# keep backtracking linear on long runs of spaces or digits
+_PERCENTAGE_RE = re.compile(r'(?<!\d)(\d+)%')
+_AMOUNT_RE = re.compile(r'rs\.?\s*(\d+)|₹\s*(\d+)')
+_DAYS_RE = re.compile(r'(?<!\d)(\d+)\s*(day|days)')
+_MONTHS_RE = re.compile(r'(?<!\d)(\d+)\s*(month|months)')
+_YEARS_RE = re.compile(r'(?<!\d)(\d+)\s*(year|years)')
+
+_COPAY_RE = re.compile(
+    r'(?:co[-\s]?pay|copayment|co[-\s]?insurance|payable by insured)[:\s]*(?P<pct1>\d+)%'
+    r'|(?<!\d)(?P<pct2>\d+)%\s*(?:co[-\s]?pay|copayment|co-insurance)'
+)
+
+_DEDUCTIBLE_RE = re.compile(r'(?:deductible|excess|first pay)[:\s]*(?:rs\.?|₹)\s*(\d+)')
+
+_ROOM_RENT_RE = re.compile(r'(?:room rent|room charges|accommodation)[:\s]*(?:rs\.?|₹)\s*(\d+)')
+_ROOM_RENT_PERCENT_RE = re.compile(r'room rent[:\s]*(\d+)%')
+
+# Common sub-limits
+_SUB_LIMIT_TYPES = ('icu', 'surgery', 'doctor', 'medicine', 'diagnostic')
+_SUB_LIMIT_RE = re.compile(
+    r'(?P<limit_type>' + '|'.join(_SUB_LIMIT_TYPES) + r')[:\s]*(?:rs\.?|₹)\s*(?P<amount>\d+)'
+)
+
+_SUM_INSURED_PATTERNS = tuple(re.compile(p, re.I) for p in [
+    r'(?:sum\s*insured|cover|coverage|sum\s*assured)[:\s]*(?:(?:rs\.?|₹)\s*)?([\d,]+(?:\.\d{1,2})?)\s*(?:lakh|lac|crore|million|thousand)?',
+    r'(?:policy\s*amount|cover\s*amount|benefit\s*amount)[:\s]*(?:(?:rs\.?|₹)\s*)?([\d,]+(?:\.\d{1,2})?)',
+    r'(?:liability|maximum\s*benefit)[:\s]*(?:of\s*)?(?:(?:rs\.?|₹)\s*)?([\d,]+(?:\.\d{1,2})?)',
+    r'up\s*to\s*(?:(?:rs\.?|₹)\s*)?([\d,]+(?:\.\d{1,2})?)',
+    r'cover\s*of\s*(?:(?:rs\.?|₹)\s*)?([\d,]+(?:\.\d{1,2})?)'
+])
+_AMOUNT_SUFFIX_RE = re.compile(r'(?:lakh|lac|crore|million|thousand)')
+
+_PREMIUM_PATTERNS = tuple(re.compile(p, re.I) for p in [
+    r'(?:premium|annual\s*premium|yearly\s*premium)[:\s]*(?:(?:rs\.?|₹)\s*)?([\d,]+(?:\.\d{1,2})?)',
+    r'(?:policy\s*fee|installment|payment)[:\s]*(?:(?:rs\.?|₹)\s*)?([\d,]+(?:\.\d{1,2})?)',
+    r'(?:pay|payable|charged)[:\s]*(?:(?:rs\.?|₹)\s*)?([\d,]+(?:\.\d{1,2})?)\s*(?:per\s*annum|annually|yearly)',
+    r'premium\s*amount[:\s]*(?:(?:rs\.?|₹)\s*)?([\d,]+(?:\.\d{1,2})?)'
+])
+
+_ISSUE_DATE_PATTERNS = tuple(re.compile(p, re.I) for p in [
+    r'(?:policy\s*issued?|date\s*of\s*issue|issued?\s*on)[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
+    r'(?:commencement|commencing|start)[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'
+])
+
+_EXPIRY_DATE_PATTERNS = tuple(re.compile(p, re.I) for p in [
+    r'(?:expir|valid|validity|expiry)[:\s]*(?:date[:\s]*)?(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
+    r'(?:valid\s*until|expires?\s*on)[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'
+])
+
+# Benefit sentences; the named group that matched gives the benefit type
+_BENEFIT_RE = re.compile(
+    r'(?:covers?|coverage\s*for|benefit\s*of)\s+(?P<coverage>[^.]{10,50})\.'
+    r'|(?:includes?|inclusions?)[:\s]+(?P<inclusion>[^.]{10,50})\.'
+    r'|(?:provides?|offer|offering)[:\s]+(?P<benefit>[^.]{10,50})\.'
+)
+
+_EXCLUSION_RE = re.compile(
+    r'(?:not\s+cover(?:ed)?|exclusion|excluded|will\s+not\s+pay|not\s+liable'
+    r'|does\s+not\s+apply|not\s+included|limitations?|restrictions?'
+    r'|waiting\s+period|pre-existing\s+condition)[^.]*\.'
+)
+_WHITESPACE_RE = re.compile(r'\s+')
+_NUMBER_RE = re.compile(r'(\d+)')
+_POLICY_NUMBER_RE = re.compile(r'policy\s*(?:no|number)[:\s]*([A-Z0-9/-]+)', re.I)
+_NOT_COVER_RE = re.compile(r'not\s+cover')  # Line breaks in PDF text can fall between the words
+
+# Waiting period phrasings; each alternative captures (number, unit)
+_WAITING_PERIOD_RE = re.compile(
+    r'waiting\s*period\s*(?:of\s*)?(\d+)\s*(day|days|month|months|year|years)'
+    r'|(?<!\d)(\d+)\s*(day|days|month|months|year|years)\s+waiting\s*period'
+    r'|initial\s+waiting\s+period\s*(?:of\s*)?(\d+)\s*(day|days|month|months|year|years)?'
+    r'|waiting\s+period\s+applicable\s*(?:for\s*)?(\d+)\s*(day|days|month|months|year|years)'
+)
+
+# Key clause terms, matched sentence by sentence against the original-case text
+_CLAUSE_PATTERNS = tuple((term, re.compile(p, re.I)) for term, p in {
+    "waiting period": r'waiting[-\s]?period|waiting\s+time|pre[-\s]?existing\s+waiting',
+    "exclusion": r'exclusion|not\s+cover|will\s+not\s+cover|excluded|not\s+payable',
+    "co-pay": r'co[-\s]?pay|copayment|co-payment|coinsurance',
+    "sub-limit": r'sub[-\s]?limit|sublimit|limit\s+of\s+coverage|cap\s+of',
+    "room rent": r'room\s+rent|room\s+charges|accommodation\s+benefit',
+    "pre-existing": r'pre[-\s]?existing|preexisting|known\s+condition',
+    "claim": r'claim\s+process|claim\s+filing|intimation|claim\s+settlement',
+    "deductible": r'deductible|excess|first\s+pay'
+}.items())
+
+# Keyword groups counted by RiskPredictor.extract_features
+_FEATURE_KEYWORDS = {
+    'waiting_period': ['waiting period', 'waiting time', 'cooling period'],
+    'exclusion': ['exclusion', 'not covered', 'excluded', 'not payable'],
+    'co_pay': ['co-pay', 'copay', 'coinsurance', 'payable by insured'],
+    'sub_limit': ['sub-limit', 'sublimit', 'cap of', 'maximum limit'],
+    'room_rent': ['room rent', 'room charges', 'accommodation'],
+    'pre_existing': ['pre-existing', 'preexisting', 'existing condition'],
+    'claim_days': ['within 24 hours', 'within 48 hours', 'immediately'],
+    'deductible': ['deductible', 'excess amount', 'first pay'],
+    'disease': ['cancer', 'diabetes', 'heart', 'kidney', 'liver', 'hiv'],
+    'surgery': ['surgery', 'operation', 'procedure', 'treatment'],
+    'hospital': ['hospital', 'medical', 'healthcare', 'clinic'],
+    'percentage': ['%', 'percent', 'percentage'],
+    'money': ['rupees', 'rs', 'inr', 'lakh', 'thousand'],
+    'time': ['day', 'days', 'month', 'months', 'year', 'years'],
+    'limit': ['limit', 'capped', 'maximum', 'upto']
+}
+
+# Feature category index for each keyword, so a hit is tallied straight into its bucket
+_FEATURE_NAMES = tuple(_FEATURE_KEYWORDS)
+_FEATURE_WORD_INDEX = {word: index for index, words in enumerate(_FEATURE_KEYWORDS.values()) for word in words}
+
+# Keywords used to detect the policy type from the document itself
+_DETECTION_TYPE_KEYWORDS = {
+    "Health Insurance": ['health', 'medical', 'hospital', 'surgery', 'disease', 'treatment', 'doctor', 'medicine', 'illness', 'diagnosis'],
+    "Car Insurance": ['car', 'vehicle', 'motor', 'automobile', 'accident', 'drive', 'driver', 'collision', 'theft', 'damage'],
+    "Life Insurance": ['life', 'death', 'term', 'maturity', 'nominee', 'assured', 'survival', 'beneficiary'],
+    "Travel Insurance": ['travel', 'trip', 'flight', 'baggage', 'overseas', 'foreign', 'passport', 'visa', 'journey']
+}
+
+# Indicator words for PolicyAnalyzer.analyze_policy_quality
+_QUALITY_INDICATORS = {
+    'clarity': [
+        'clear', 'simple', 'understand', 'easy', 'plain',
+        'explain', 'described', 'definition', 'meaning'
+    ],
+    'comprehensiveness': [
+        'comprehensive', 'complete', 'full', 'extensive', 'broad',
+        'wide', 'range', 'variety', 'multiple', 'various'
+    ],
+    'transparency': [
+        'transparent', 'disclose', 'disclosure', 'clear', 'explicit',
+        'specifically', 'detailed', 'details', 'specific', 'particular'
+    ]
+}
+
+# Coverage risk adjustment for the policy type the user selected
+_POLICY_TYPE_COVERAGE_ADJUSTMENT = {
+    "Health Insurance": 10,  # Health policies have more exclusions
+    "Car Insurance": -10,
+    "Life Insurance": -5
+}
+
+# Pre-existing conditions treated as critical, matched as substrings of the user's input
+_CRITICAL_DISEASES = ('diabetes', 'blood pressure', 'heart', 'cancer', 'thyroid')
+
+def build_keyword_automaton(keywords):
+    """Build an Aho-Corasick automaton that reports each matched keyword"""
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+def count_keywords(automaton, text_lower):
+    """Count occurrences of every automaton keyword in a single pass over the text"""
+    return Counter(map(itemgetter(1), automaton.iter(text_lower)))
+
+class RiskPredictor:
+    """ML-based risk prediction model"""
+    
+    @staticmethod
+    def extract_features(text_lower, keyword_counts=None):
+        """Extract numerical features from lowercased text"""
+        if keyword_counts is None:
+            keyword_counts = count_keywords(_KEYWORD_AUTOMATON, text_lower)
+        
+        # 1. Count specific keywords (each gives different weight)
+        category_counts = [0] * len(_FEATURE_NAMES)
+        for word, count in keyword_counts.items():
+            index = _FEATURE_WORD_INDEX.get(word)
+            if index is not None:
+                category_counts[index] += count
+        features = dict(zip(_FEATURE_NAMES, category_counts))
+        
+        # 2. Find percentages
+        percentages = _PERCENTAGE_RE.findall(text_lower)
+        features['avg_percentage'] = sum(int(p) for p in percentages) / len(percentages) if percentages else 0
+        
+        # 3. Find monetary values
+        flat_amounts = [int(rs or rupee) for rs, rupee in _AMOUNT_RE.findall(text_lower)]
+        features['avg_amount'] = sum(flat_amounts) / len(flat_amounts) if flat_amounts else 0
+        
+        # 4. Find time periods
+        days = _DAYS_RE.findall(text_lower)
+        months = _MONTHS_RE.findall(text_lower)
+        years = _YEARS_RE.findall(text_lower)
+        
+        features['has_days'] = len(days)
+        features['has_months'] = len(months)
+        features['has_years'] = len(years)
+        
+        # 5. Document complexity (longer = more complex = higher risk)
+        features['length'] = min(len(text_lower) / 1000, 10)  # Normalize
+        
+        return features
+    
+    @staticmethod
+    def predict_risk(text_lower, policy_type, age, has_disease):
+        """Predict risk scores based on document features"""
+        features = RiskPredictor.extract_features(text_lower)
+        return RiskPredictor.score_features(features, policy_type, age, has_disease)
+    
+    @staticmethod
+    def score_features(features, policy_type, age, has_disease):
+        """Turn extracted document features into clamped risk scores"""
+        # Coverage Risk (based on exclusions, waiting periods, disease mentions)
+        coverage_risk = (20  # Base
+                         + features['waiting_period'] * 8
+                         + features['exclusion'] * 10
+                         + features['pre_existing'] * 12
+                         + features['disease'] * 5
+                         + features['has_years'] * 5
+                         + _POLICY_TYPE_COVERAGE_ADJUSTMENT.get(policy_type, 0))
+        
+        # Cost Risk (based on co-pay, sub-limits, percentages)
+        cost_risk = (15  # Base
+                     + features['co_pay'] * 12
+                     + features['sub_limit'] * 10
+                     + features['room_rent'] * 8
+                     + features['percentage'] * 5
+                     + features['money'] * 3
+                     + features['deductible'] * 10)
+        
+        # Add percentage impact
+        cost_risk += features['avg_percentage'] * 1.5
+        
+        # Delay Risk (based on claim conditions, time limits)
+        delay_risk = (10  # Base
+                      + features['claim_days'] * 15
+                      + features['time'] * 4
+                      + features['has_days'] * 8
+                      + features['has_months'] * 5)
+        
+        # Add user profile impact
+        if age > 60:
+            coverage_risk += 15
+            delay_risk += 10
+        elif age > 45:
+            coverage_risk += 8
+            delay_risk += 5
+        
+        if has_disease:
+            coverage_risk += 20
+            cost_risk += 10
+        
+        # Ensure within 0-100
+        coverage_risk = min(max(int(coverage_risk), 0), 100)
+        cost_risk = min(max(int(cost_risk), 0), 100)
+        delay_risk = min(max(int(delay_risk), 0), 100)
+        
+        return {
+            'coverage_risk': coverage_risk,
+            'cost_risk': cost_risk,
+            'delay_risk': delay_risk
+        }
+    
+    @staticmethod
+    def extract_co_pay_percentage(text_lower):
+        """Extract co-pay percentage from lowercased policy text"""
+        
+        match = _COPAY_RE.search(text_lower)
+        if match:
+            return int(match.group('pct1') or match.group('pct2'))
+        
+        # Check for generic mentions of co-pay without percentage
+        if 'co-pay' in text_lower or 'copay' in text_lower or 'co-payment' in text_lower:
+            return 10  # Default if co-pay exists but no percentage mentioned
+        
+        return 0
+    
+    @staticmethod
+    def extract_deductible(text_lower):
+        """Extract deductible amount from lowercased policy text"""
+        
+        match = _DEDUCTIBLE_RE.search(text_lower)
+        if match:
+            return int(match.group(1))
+        
+        return 0
+    
+    @staticmethod
+    def extract_room_rent_cap(text_lower):
+        """Extract room rent capping from lowercased policy text"""
+        
+        match = _ROOM_RENT_RE.search(text_lower)
+        if match:
+            return match.group(1)
+        
+        # Check for percentage-based room rent capping
+        percent_match = _ROOM_RENT_PERCENT_RE.search(text_lower)
+        if percent_match:
+            return percent_match.group(1) + "%"
+        
+        return None
+    
+    @staticmethod
+    def extract_sub_limits(text_lower):
+        """Extract various sub-limits from lowercased policy text"""
+        found = {}
+        
+        # Single pass; keep the first amount seen for each limit type
+        for match in _SUB_LIMIT_RE.finditer(text_lower):
+            found.setdefault(match.group('limit_type'), int(match.group('amount')))
+        
+        return {limit_type: found[limit_type] for limit_type in _SUB_LIMIT_TYPES if limit_type in found}
+
 class PolicyAnalyzer:
-    # Add your implementation here
-    pass
\ No newline at end of file
+    """Enhanced policy analysis engine"""
+    
+    # Comprehensive policy type database
+    POLICY_TYPES = {
+        "Health Insurance": {
+            'keywords': ['health', 'medical', 'hospital', 'surgery', 'disease', 'treatment', 'doctor', 
+                        'medicine', 'clinical', 'diagnosis', 'patient', 'healthcare', 'policy', 'insurance', 
+                        'cover', 'benefits', 'cashless', 'reimbursement', 'room rent', 'icu', 'pre-existing',
+                        'waiting period', 'copay', 'day care', 'hospitalization'],
+            'weight': 1.5,
+            'color': '#FF6B6B',
+            'icon': '🏥'
+        },
+        "Car Insurance": {
+            'keywords': ['car', 'vehicle', 'motor', 'automobile', 'accident', 'drive', 'driver', 'collision', 
+                        'repair', 'garage', 'road', 'traffic', 'third party', 'comprehensive', 'own damage',
+                        'theft', 'liability', 'no claim bonus', 'depreciation', 'towing', 'tire', 'engine'],
+            'weight': 1.5,
+            'color': '#4ECDC4',
+            'icon': '🚗'
+        },
+        "Life Insurance": {
+            'keywords': ['life', 'death', 'term', 'maturity', 'nominee', 'beneficiary', 'assured', 'policyholder', 
+                        'premium', 'sum assured', 'survival', 'mortality', 'endowment', 'whole life', 'riders',
+                        'critical illness', 'accidental death', 'disability', 'income benefit'],
+            'weight': 1.5,
+            'color': '#45B7D1',
+            'icon': '💚'
+        },
+        "Travel Insurance": {
+            'keywords': ['travel', 'trip', 'flight', 'baggage', 'overseas', 'foreign', 'passport', 'journey', 
+                        'tour', 'abroad', 'holiday', 'vacation', 'airline', 'trip cancellation', 'delay',
+                        'lost luggage', 'emergency evacuation', 'travel assistance'],
+            'weight': 1.5,
+            'color': '#96CEB4',
+            'icon': '✈️'
+        },
+        "Home Insurance": {
+            'keywords': ['home', 'house', 'property', 'building', 'contents', 'fire', 'theft', 'flood', 
+                        'earthquake', 'residence', 'household', 'structure', 'burglary', 'natural disaster',
+                        'personal belongings', 'liability', 'renovation'],
+            'weight': 1.5,
+            'color': '#FFE194',
+            'icon': '🏠'
+        },
+        "Bike Insurance": {
+            'keywords': ['bike', 'motorcycle', 'two wheeler', 'scooter', 'helmet', 'rider', 'biking', 
+                        'motorcycling', 'two-wheeler', 'accessories', 'pillion', 'comprehensive'],
+            'weight': 1.5,
+            'color': '#D4A5A5',
+            'icon': '🏍️'
+        }
+    }
+    
+    @staticmethod
+    def extract_policy_type(text_lower):
+        """Enhanced policy type detection with confidence scoring"""
+        keyword_counts = count_keywords(_KEYWORD_AUTOMATON, text_lower)
+        
+        scores = {}
+        keyword_matches = {}
+        
+        for p_type, data in PolicyAnalyzer.POLICY_TYPES.items():
+            matches = Counter({keyword: keyword_counts[keyword] for keyword in data['keywords'] if keyword in keyword_counts})
+            keyword_matches[p_type] = matches
+            scores[p_type] = sum(matches.values()) * data['weight']
+        
+        # Sort by score
+        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        
+        # Calculate confidence
+        total_score = sum(scores.values()) or 1
+        results = []
+        
+        for p_type, score in sorted_scores:
+            confidence = (score / total_score) * 100
+            if confidence > 5:  # Only include meaningful matches
+                results.append({
+                    'type': p_type,
+                    'confidence': round(confidence, 1),
+                    'score': score,
+                    'matched_keywords': [keyword for keyword, _ in keyword_matches[p_type].most_common(5)]  # Top 5 keywords
+                })
+        
+        return results
+    
+    @staticmethod
+    def extract_sum_insured(text_lower):
+        """Extract sum insured with multiple patterns"""
+        
+        for pattern in _SUM_INSURED_PATTERNS:
+            match = pattern.search(text_lower)
+            if match:
+                amount = match.group(1).replace(',', '')
+                # Check for lakh/crore suffixes
+                suffix_match = _AMOUNT_SUFFIX_RE.search(text_lower, match.end(), match.end() + 10)
+                if suffix_match:
+                    suffix = suffix_match.group()
+                    if 'lakh' in suffix or 'lac' in suffix:
+                        amount = str(float(amount) * 100000)
+                    elif 'crore' in suffix:
+                        amount = str(float(amount) * 10000000)
+                    elif 'million' in suffix:
+                        amount = str(float(amount) * 1000000)
+                    elif 'thousand' in suffix:
+                        amount = str(float(amount) * 1000)
+                return amount
+        
+        return "Not specified"
+    
+    @staticmethod
+    def extract_premium(text_lower):
+        """Extract premium amount with multiple patterns"""
+        
+        for pattern in _PREMIUM_PATTERNS:
+            match = pattern.search(text_lower)
+            if match:
+                return match.group(1).replace(',', '')
+        
+        return "Not specified"
+    
+    @staticmethod
+    def extract_key_dates(text_lower):
+        """Extract important policy dates"""
+        dates = {}
+        
+        # Policy issue date
+        for pattern in _ISSUE_DATE_PATTERNS:
+            match = pattern.search(text_lower)
+            if match:
+                dates['issue_date'] = match.group(1)
+                break
+        
+        # Expiry date
+        for pattern in _EXPIRY_DATE_PATTERNS:
+            match = pattern.search(text_lower)
+            if match:
+                dates['expiry_date'] = match.group(1)
+                break
+        
+        return dates
+    
+    @staticmethod
+    def extract_benefits(text_lower):
+        """Extract key benefits from policy"""
+        benefits = []
+        seen = set()
+        type_counts = defaultdict(int)
+        
+        for match in _BENEFIT_RE.finditer(text_lower):
+            benefit_type = match.lastgroup
+            if type_counts[benefit_type] >= 3:  # Limit per type
+                continue
+            type_counts[benefit_type] += 1
+            
+            benefit_text = match.group(benefit_type)
+            if len(benefit_text) > 15 and benefit_text not in seen:
+                seen.add(benefit_text)
+                benefits.append({
+                    'text': benefit_text.strip().capitalize(),
+                    'type': benefit_type
+                })
+                if len(benefits) == 8:  # Return top 8 benefits
+                    break
+        
+        return benefits
+    
+    @staticmethod
+    def extract_exclusions(text_lower):
+        """Enhanced exclusion extraction"""
+        exclusions = {}  # Ordered set of cleaned sentences
+        
+        for match in _EXCLUSION_RE.finditer(text_lower):
+            # Clean up the text
+            clean_match = _WHITESPACE_RE.sub(' ', match.group().strip())
+            if len(clean_match) > 15:
+                exclusions[clean_match.capitalize()] = None
+                if len(exclusions) == 8:  # Keep 8
+                    break
+        
+        return list(exclusions)
+    
+    @staticmethod
+    def extract_key_clauses(text):
+        """Extract key clauses from policy text"""
+        clauses = {}
+        
+        for term, pattern in _CLAUSE_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                # None of the patterns can span a '.', so widen the match to its sentence
+                start = text.rfind('.', 0, match.start()) + 1
+                end = text.find('.', match.end())
+                if end == -1:
+                    end = len(text)
+                clauses[term] = text[start:end].strip() + "."
+            else:
+                clauses[term] = "Not mentioned in document"
+        
+        return clauses
+    
+    @staticmethod
+    def analyze_policy_quality(text_lower, keyword_counts=None):
+        """Analyze policy quality metrics from lowercased text"""
+        if keyword_counts is None:
+            keyword_counts = count_keywords(_KEYWORD_AUTOMATON, text_lower)
+        
+        metrics = {}
+        for metric, indicators in _QUALITY_INDICATORS.items():
+            score = sum(keyword_counts[ind] for ind in indicators)
+            metrics[metric] = min(100, score * 10)
+        
+        return metrics
+    
+    @staticmethod
+    def analyze_risk_factors(age, disease, *, text_lower=None, copay=None, deductible=None,
+                             waiting_period=None, exclusion_count=None):
+        """Enhanced risk analysis; any policy value not passed in is extracted from text_lower"""
+        missing = [name for name, value in (('copay', copay), ('deductible', deductible),
+                                            ('waiting_period', waiting_period),
+                                            ('exclusion_count', exclusion_count)) if value is None]
+        if missing and text_lower is None:
+            raise ValueError(f"text_lower is required to extract {', '.join(missing)}")
+        
+        risk_factors = []
+        
+        # Age factor with detailed analysis
+        if age > 60:
+            risk_factors.append({
+                "factor": "Age", 
+                "impact": "High", 
+                "score": 85,
+                "description": "Age above 60 significantly increases claim scrutiny and premium",
+                "recommendation": "Consider policies with lower age restrictions or senior citizen plans"
+            })
+        elif age > 50:
+            risk_factors.append({
+                "factor": "Age", 
+                "impact": "Medium-High", 
+                "score": 65,
+                "description": "Age between 50-60 may affect premium and coverage options",
+                "recommendation": "Review age-related clauses and premium loading carefully"
+            })
+        elif age > 40:
+            risk_factors.append({
+                "factor": "Age", 
+                "impact": "Medium", 
+                "score": 45,
+                "description": "Moderate age-related risk factors to consider",
+                "recommendation": "Standard age-related considerations apply"
+            })
+        
+        # Disease factor with detailed analysis
+        if disease and disease.lower() != 'none':
+            disease_lower = disease.lower()
+            if any(term in disease_lower for term in _CRITICAL_DISEASES):
+                risk_factors.append({
+                    "factor": "Pre-existing condition", 
+                    "impact": "Critical", 
+                    "score": 90,
+                    "description": f"History of {disease} will significantly impact coverage and may have long waiting periods",
+                    "recommendation": "Look for policies with shorter waiting periods for pre-existing conditions"
+                })
+            else:
+                risk_factors.append({
+                    "factor": "Pre-existing condition", 
+                    "impact": "High", 
+                    "score": 75,
+                    "description": f"History of {disease} may affect coverage and require waiting periods",
+                    "recommendation": "Check waiting period clauses and sub-limits for this condition"
+                })
+        
+        # Exclusion analysis
+        if exclusion_count is None:
+            exclusion_count = PolicyAnalyzer.count_exclusion_terms(text_lower)
+        if exclusion_count > 8:
+            risk_factors.append({
+                "factor": "High exclusion count", 
+                "impact": "High", 
+                "score": 80,
+                "description": f"Policy contains {exclusion_count} exclusion-related terms - higher than average",
+                "recommendation": "Review all exclusions carefully; consider if coverage gaps exist"
+            })
+        elif exclusion_count > 4:
+            risk_factors.append({
+                "factor": "Moderate exclusions", 
+                "impact": "Medium", 
+                "score": 50,
+                "description": f"Policy contains {exclusion_count} exclusion-related terms",
+                "recommendation": "Understand key exclusions that may affect your specific needs"
+            })
+        
+        # Waiting period analysis
+        if waiting_period is None:
+            waiting_period = PolicyAnalyzer.extract_waiting_period(text_lower)
+        if "year" in waiting_period.lower():
+            years = _NUMBER_RE.search(waiting_period)
+            if years and int(years.group(1)) > 2:
+                risk_factors.append({
+                    "factor": "Long waiting period", 
+                    "impact": "High", 
+                    "score": 75,
+                    "description": f"Long waiting period of {waiting_period} before full coverage applies",
+                    "recommendation": "Consider if you can wait this period for claims; check for shorter alternatives"
+                })
+        elif "month" in waiting_period.lower():
+            risk_factors.append({
+                "factor": "Waiting period applies", 
+                "impact": "Medium", 
+                "score": 40,
+                "description": f"Waiting period of {waiting_period} applies for certain conditions",
+                "recommendation": "Plan healthcare needs around the waiting period"
+            })
+        
+        # Co-pay analysis
+        if copay is None:
+            copay = RiskPredictor.extract_co_pay_percentage(text_lower)
+        if copay > 30:
+            risk_factors.append({
+                "factor": "Very high co-pay", 
+                "impact": "Critical", 
+                "score": 90,
+                "description": f"High co-pay of {copay}% means significant out-of-pocket expenses",
+                "recommendation": "Consider policies with lower co-pay or build savings for co-pay amount"
+            })
+        elif copay > 20:
+            risk_factors.append({
+                "factor": "High co-pay", 
+                "impact": "High", 
+                "score": 70,
+                "description": f"Co-pay of {copay}% requires substantial out-of-pocket payment",
+                "recommendation": "Budget for co-pay amounts and check if co-pay applies to all claims"
+            })
+        elif copay > 10:
+            risk_factors.append({
+                "factor": "Moderate co-pay", 
+                "impact": "Medium", 
+                "score": 40,
+                "description": f"Co-pay of {copay}% applies",
+                "recommendation": "Standard co-pay arrangement; plan for this expense"
+            })
+        
+        # Deductible analysis
+        if deductible is None:
+            deductible = RiskPredictor.extract_deductible(text_lower)
+        if deductible > 50000:
+            risk_factors.append({
+                "factor": "High deductible", 
+                "impact": "High", 
+                "score": 75,
+                "description": f"Deductible of ₹{deductible:,} must be paid before coverage starts",
+                "recommendation": "Ensure you have funds available for the deductible amount"
+            })
+        elif deductible > 10000:
+            risk_factors.append({
+                "factor": "Moderate deductible", 
+                "impact": "Medium", 
+                "score": 45,
+                "description": f"Deductible of ₹{deductible:,} applies per claim",
+                "recommendation": "Plan for this out-of-pocket expense per claim"
+            })
+        
+        return risk_factors
+    
+    @staticmethod
+    def count_exclusion_terms(text_lower):
+        """Count exclusion-related terms in lowercased text"""
+        return (text_lower.count('exclusion') + text_lower.count('excluded') +
+                sum(1 for _ in _NOT_COVER_RE.finditer(text_lower)))
+    
+    @staticmethod
+    def extract_waiting_period(text_lower):
+        """Enhanced waiting period extraction from lowercased text"""
+        match = _WAITING_PERIOD_RE.search(text_lower)
+        if match:
+            # Only the alternative that matched has its number set
+            groups = match.groups()
+            i = next(i for i in range(0, len(groups), 2) if groups[i] is not None)
+            return f"{groups[i]} {groups[i + 1] or 'months'}"
+        
+        # Check if waiting period mentioned but no duration
+        if 'waiting period' in text_lower:
+            return "Mentioned (duration not specified)"
+        
+        return "Not specified"
+    
+    @staticmethod
+    def calculate_risk_score(age, disease, risk_factors, coverage, ml_risks):
+        """Calculate comprehensive risk score using ML predictions"""
+        # Use ML predicted risks as base
+        coverage_risk = ml_risks.get('coverage_risk', 50)
+        cost_risk = ml_risks.get('cost_risk', 50)
+        delay_risk = ml_risks.get('delay_risk', 50)
+        
+        # Weighted average for overall risk
+        overall_risk = (coverage_risk * 0.4 + cost_risk * 0.35 + delay_risk * 0.25)
+        
+        return {
+            'coverage_risk': coverage_risk,
+            'cost_risk': cost_risk,
+            'delay_risk': delay_risk,
+            'overall_risk': round(overall_risk, 1)
+        }
+
+# Single automaton covering the feature, type detection and quality keywords
+_KEYWORD_AUTOMATON = build_keyword_automaton(
+    {word for words in _FEATURE_KEYWORDS.values() for word in words} |
+    {word for data in PolicyAnalyzer.POLICY_TYPES.values() for word in data['keywords']} |
+    {word for words in _DETECTION_TYPE_KEYWORDS.values() for word in words} |
+    {word for words in _QUALITY_INDICATORS.values() for word in words}
+)
+
+def analyze_policy_text(text):
+    """Run the extractors that depend only on the policy text"""
+    # Lowercase once; the extractors below all work on the lowercased text
+    text_lower = text.lower()
+    
+    # One automaton pass tallies every keyword the detectors and scorers need
+    keyword_counts = count_keywords(_KEYWORD_AUTOMATON, text_lower)
+    
+    # Detect policy type from PDF content
+    detected_type = "Unknown"
+    best_score = 0
+    for p_type, keywords in _DETECTION_TYPE_KEYWORDS.items():
+        score = sum(keyword_counts[word] for word in keywords)
+        if score > best_score:  # Strict, so ties keep the earlier type
+            detected_type, best_score = p_type, score
+    
+    policy_number = _POLICY_NUMBER_RE.search(text)
+    
+    return {
+        'detected_type': detected_type,
+        'clauses': PolicyAnalyzer.extract_key_clauses(text),
+        'co_pay_percentage': RiskPredictor.extract_co_pay_percentage(text_lower),
+        'deductible': RiskPredictor.extract_deductible(text_lower),
+        'room_rent_cap': RiskPredictor.extract_room_rent_cap(text_lower),
+        'sub_limits': RiskPredictor.extract_sub_limits(text_lower),
+        'features': RiskPredictor.extract_features(text_lower, keyword_counts),
+        'policy_number': policy_number.group(1) if policy_number else "Not found",
+        'sum_insured': PolicyAnalyzer.extract_sum_insured(text_lower),
+        'premium': PolicyAnalyzer.extract_premium(text_lower),
+        'key_dates': PolicyAnalyzer.extract_key_dates(text_lower),
+        'benefits': PolicyAnalyzer.extract_benefits(text_lower),
+        'exclusions': PolicyAnalyzer.extract_exclusions(text_lower),
+        'comprehensive': "Yes" if "comprehensive" in text_lower else "Limited/Specified",
+        'waiting_period': PolicyAnalyzer.extract_waiting_period(text_lower),
+        'exclusion_count': PolicyAnalyzer.count_exclusion_terms(text_lower),
+        'quality_metrics': PolicyAnalyzer.analyze_policy_quality(text_lower, keyword_counts)
+    }
+
+def analyze_pdf(pdf_bytes):
+    """Extract and analyze a PDF, runs in the analysis worker processes"""
+    text, page_count = extract_pdf_text(pdf_bytes)
+    analysis = analyze_policy_text(text) if text.strip() else None
+    return text, page_count, analysis
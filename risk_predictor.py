@@ -1,6 +0,0 @@
-class RiskPredictor:
-    @staticmethod
-    def extract_co_pay_percentage(text):
-        # Add your implementation here
-        # This is a placeholder
-        return 0  # Return appropriate value
\ No newline at end of file